@@ -0,0 +1,229 @@
+##############################
+#
+# bench_admin.py - latency and memory benchmark of the Admin routes and helpers
+#
+# python benchmarks/bench_admin.py [--sizes 1000,100000,1000000] [--repeat 30]
+#                                  [--storage flatfile] [--db-uri mongodb://...] [--no-mongomock]
+#                                  [--data-dir DIR] [--out benchmarks/results] [--compare FILE]
+#
+# Seeds a 'bench' collection of each size on MontyDB, on mongomock when it is installed
+# and on a real MongoDB when --db-uri is given, then calls view_all, view_collection,
+# edit_fields (GET and POST), edit_schema, edit_json, login and the pure helpers
+# (expand_fields, _flatten_dict, _schema_transform) with full WSGI environments.
+# Latency percentiles and peak traced memory are printed and written to a JSON file,
+# --compare prints the change of every case against an earlier result file.
+#
+# Seeding 1M documents takes a while, use --data-dir to keep the seeded databases
+# between runs (they are reused when their document count matches).
+#
+##################################
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from minimus import Minimus, Session
+import minimus_admin
+
+SCHEMA = '\n'.join([
+    '^#name : textbox : Name',
+    '^n : textbox : Number : int',
+    'group : textbox : Group',
+    'address.city : textbox : City',
+    'address.zip : textbox : Zip',
+    'notes : textarea : Notes',
+])
+
+
+def document(i):
+    """document(i) - the i-th synthetic document"""
+    return {'name': 'name %07d' % i, 'n': i, 'group': 'g%d' % (i % 10), 'tags': ['t%d' % (i % 7), 'all'],
+            'address': {'city': 'city %d' % (i % 100), 'zip': '%05d' % (i % 99999)},
+            'notes': 'lorem ipsum dolor sit amet ' * 4}
+
+
+def make_admin(backend, size, args, tmp):
+    """make_admin(backend, size, args, tmp) - an Admin on a database holding 'bench' with size documents"""
+    app = Minimus(__name__)
+    options = dict(session=Session(), login_ip_limit=None, login_user_limit=None)
+    if backend == 'montydb':
+        data_dir = args.data_dir or tmp
+        options.update(db_file=os.path.join(data_dir, 'bench-%s-%d.db' % (args.storage, size)), db_storage=args.storage)
+        if args.storage == 'sqlite':
+            options['db_storage_options'] = {'check_same_thread': False}
+    elif backend == 'mongomock':
+        import mongomock
+        client = mongomock.MongoClient()
+        minimus_admin._clients[('mongodb://mongomock/%d' % size, '[]')] = client
+        options.update(db_uri='mongodb://mongomock/%d' % size)
+    else:
+        options.update(db_uri=args.db_uri, admin_database='minimus_admin_bench_%d' % size)
+    admin = minimus_admin.Admin(app, **options)
+    seed(admin, size)
+    # every request runs as an authenticated user
+    admin.session.data.update({'is_authenticated': True, 'user': {'username': 'bench'}})
+    return admin
+
+
+def seed(admin, size, batch_size=10000):
+    """seed(admin, size) - fill 'bench' unless it already holds size documents, add the schema and a user"""
+    db = admin.app.db
+    if db['bench'].count_documents({}) != size:
+        db['bench'].drop()
+        for start in range(0, size, batch_size):
+            db['bench'].insert_many([document(i) for i in range(start, min(size, start + batch_size))])
+    db['_meta'].replace_one({'name': 'bench'}, {'name': 'bench', 'schema': SCHEMA}, upsert=True)
+    minimus_admin._invalidate_schema(admin._schema_key('bench'))
+    if not admin.get_user('bench'):
+        admin.create_user('bench', 'secret')
+
+
+def environ(method='GET', query='', form=None):
+    """environ(method, query, form) - a complete WSGI environment, form is sent url-encoded"""
+    env = {}
+    setup_testing_defaults(env)
+    body = urlencode(form or {}).encode('utf-8')
+    env.update({'REQUEST_METHOD': method, 'QUERY_STRING': query, 'wsgi.input': io.BytesIO(body),
+                'CONTENT_TYPE': 'application/x-www-form-urlencoded', 'CONTENT_LENGTH': str(len(body))})
+    return env
+
+
+def cases(admin):
+    """
+    cases(admin) - list of (name, callable, expected) benchmarked against one database,
+    expected is what a working call returns (see check)
+    """
+    db = admin.app.db
+    h = admin.handlers
+    doc = db['bench'].find_one({}, sort=[('_id', 1)])
+    id = str(doc['_id'])
+    data = db['bench'].find_one({'_id': doc['_id']})
+    schema = admin.get_schema('bench')
+    flat = minimus_admin._flatten_dict({k: v for k, v in data.items() if k != '_id'})
+    form = {k: str(v) for k, v in flat.items()}
+    return [
+        ('view_all', lambda: h['admin_view_all'](environ()), 'page'),
+        ('view_collection', lambda: h['admin_view_collection'](environ(), coll='bench'), 'page'),
+        ('view_collection_filtered', lambda: h['admin_view_collection'](environ(query='q.group=g3&sort=name'), coll='bench'), 'page'),
+        ('edit_fields_get', lambda: h['admin_edit_fields'](environ(), coll='bench', id=id), 'page'),
+        ('edit_fields_post', lambda: h['admin_edit_fields'](environ('POST', form=form), coll='bench', id=id), 'redirect'),
+        ('edit_schema', lambda: h['admin_edit_schema'](environ(), coll='bench', id=id), 'page'),
+        ('edit_json', lambda: h['admin_edit_json'](environ(), coll='bench', id=id), 'page'),
+        ('login', lambda: h['admin_login'](environ('POST', form={'username': 'bench', 'password': 'secret'})), 'redirect'),
+        ('expand_fields', lambda: minimus_admin.expand_fields(form), None),
+        ('_flatten_dict', lambda: minimus_admin._flatten_dict(data), None),
+        ('_schema_transform', lambda: minimus_admin._schema_transform(dict(data), schema), None),
+    ]
+
+
+def check(name, result, expected):
+    """
+    check(name, result, expected) - stop when a case does not do its work, so an error path is never timed.
+    expected is 'page' for a rendered page, 'redirect' for a POST that went through (anything but a page)
+    or None for the helpers.
+    """
+    if expected is None:
+        return
+    if isinstance(result, bytes):
+        result = result.decode('utf-8', 'replace')
+    page = isinstance(result, str)
+    if page and '"status": "error"' in result:
+        raise SystemExit("%s failed: %s" % (name, result))
+    if expected == 'page' and not (page and result):
+        raise SystemExit("%s did not render a page: %r" % (name, result))
+    if expected == 'redirect' and page:
+        raise SystemExit("%s did not redirect: %s" % (name, result[:200]))
+
+
+def measure(f, repeat):
+    """measure(f, repeat) - latency statistics in ms over repeat calls and the peak traced memory in KiB"""
+    latencies = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        f()
+        latencies.append((time.perf_counter() - start) * 1000)
+    # memory is traced in a separate call, tracing slows the code down
+    tracemalloc.start()
+    f()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    latencies.sort()
+    percentile = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    return {'n': repeat, 'mean_ms': statistics.mean(latencies), 'p50_ms': percentile(0.50),
+            'p90_ms': percentile(0.90), 'p99_ms': percentile(0.99), 'max_ms': latencies[-1],
+            'peak_kib': peak / 1024}
+
+
+def compare(results, previous_file):
+    """compare(results, previous_file) - print the p50 change of every case found in both runs"""
+    with open(previous_file) as fp:
+        previous = {(r['backend'], r['size'], r['case']): r for r in json.load(fp)['results']}
+    print("\nchange of p50 against %s" % previous_file)
+    for r in results:
+        old = previous.get((r['backend'], r['size'], r['case']))
+        if old and old['p50_ms']:
+            ratio = r['p50_ms'] / old['p50_ms']
+            flag = '  REGRESSION' if ratio > 1.2 else ''
+            print("%-10s %8d %-26s %8.3f -> %8.3f ms  x%.2f%s"
+                  % (r['backend'], r['size'], r['case'], old['p50_ms'], r['p50_ms'], ratio, flag))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Admin route and helper benchmark')
+    parser.add_argument('--sizes', default='1000,100000,1000000')
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--storage', default='flatfile', help='MontyDB engine: flatfile, sqlite or lightning')
+    parser.add_argument('--db-uri', default=None, help='also run against this MongoDB')
+    parser.add_argument('--no-mongomock', action='store_true', help='skip mongomock even if it is installed')
+    parser.add_argument('--data-dir', default=None, help='keep seeded MontyDB databases here')
+    parser.add_argument('--out', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results'))
+    parser.add_argument('--compare', default=None, help='earlier result file to compare with')
+    args = parser.parse_args()
+
+    backends = ['montydb']
+    if not args.no_mongomock:
+        try:
+            import mongomock
+            backends.append('mongomock')
+        except ImportError:
+            pass
+    if args.db_uri:
+        backends.append('mongodb')
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in backends:
+            for size in [int(s) for s in args.sizes.split(',')]:
+                admin = make_admin(backend, size, args, tmp)
+                for name, f, expected in cases(admin):
+                    # the checked call also warms caches, templates and the schema
+                    check(name, f(), expected)
+                    r = measure(f, args.repeat)
+                    r.update({'backend': backend, 'size': size, 'case': name})
+                    results.append(r)
+                    print("%-10s %8d %-26s p50 %9.3f  p90 %9.3f  p99 %9.3f ms  peak %9.1f KiB"
+                          % (backend, size, name, r['p50_ms'], r['p90_ms'], r['p99_ms'], r['peak_kib']))
+
+    os.makedirs(args.out, exist_ok=True)
+    out = os.path.join(args.out, 'bench-%s-%s.json' % (minimus_admin.__version__, time.strftime('%Y%m%d-%H%M%S')))
+    with open(out, 'w') as fp:
+        json.dump({'version': minimus_admin.__version__, 'python': platform.python_version(),
+                   'platform': platform.platform(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                   'repeat': args.repeat, 'storage': args.storage, 'results': results}, fp, indent=1)
+    print("\nresults written to %s" % out)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
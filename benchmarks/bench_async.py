@@ -0,0 +1,127 @@
+##############################
+#
+# bench_async.py - compare Admin (thread per request) with AsyncAdmin (asyncio)
+#
+# python benchmarks/bench_async.py [--docs 2000] [--concurrency 64] [--requests 512] [--db-uri mongodb://...]
+#
+# Seeds a throw-away database, then serves the same mix of view_all, view_collection
+# and login requests with a thread per in-flight request (Admin) and with one
+# event loop (AsyncAdmin.dispatch), printing throughput, latency and thread count.
+#
+##################################
+import argparse
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from minimus import Minimus, Session
+import minimus_admin
+
+
+def seed(admin, docs):
+    """seed(admin, docs) - a 'bench' collection of docs documents and one user"""
+    admin.app.db['bench'].drop()
+    admin.app.db['bench'].insert_many([{'n': i, 'name': 'doc %d' % i, 'tags': ['a', 'b']} for i in range(docs)])
+    admin.app.db[admin.users_collection].delete_many({'username': 'bench'})
+    admin.create_user('bench', 'secret')
+
+
+def login_env():
+    body = b'username=bench&password=secret'
+    return {'REQUEST_METHOD': 'POST', 'REMOTE_ADDR': '127.0.0.1', 'wsgi.input': io.BytesIO(body),
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded', 'CONTENT_LENGTH': str(len(body)),
+            'QUERY_STRING': ''}
+
+
+def requests(count):
+    """requests(count) - the request mix, a list of (route_name, env, kwargs)"""
+    mix = [
+        ('admin_view_all', lambda: {'REQUEST_METHOD': 'GET', 'QUERY_STRING': ''}, {}),
+        ('admin_view_collection', lambda: {'REQUEST_METHOD': 'GET', 'QUERY_STRING': ''}, {'coll': 'bench'}),
+        ('admin_login', login_env, {}),
+    ]
+    return [(route, make_env(), kwargs) for route, make_env, kwargs in (mix[i % len(mix)] for i in range(count))]
+
+
+def make_admin(cls, args, db_file):
+    app = Minimus(__name__)
+    options = dict(session=Session(), db_file=db_file, db_uri=args.db_uri,
+                   login_ip_limit=None, login_user_limit=None, hash_queue_limit=args.requests)
+    if cls is minimus_admin.AsyncAdmin:
+        options['db_workers'] = args.workers
+    return cls(app, **options)
+
+
+def timed(f, *a, **kw):
+    start = time.perf_counter()
+    f(*a, **kw)
+    return time.perf_counter() - start
+
+
+def run_sync(admin, reqs, concurrency):
+    """one thread per in-flight request, the way a threaded WSGI server runs Admin"""
+    def call(req):
+        route, env, kwargs = req
+        return timed(admin.handlers[route], env, **kwargs)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        latencies = list(pool.map(call, reqs))
+        peak_threads = threading.active_count()
+    return time.perf_counter() - start, latencies, peak_threads
+
+
+def run_async(admin, reqs, concurrency):
+    """all requests on one event loop, concurrency bounded by a semaphore"""
+    async def main():
+        gate = asyncio.Semaphore(concurrency)
+
+        async def call(req):
+            route, env, kwargs = req
+            async with gate:
+                start = time.perf_counter()
+                await admin.dispatch(route, env, **kwargs)
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(call(req) for req in reqs))
+        return time.perf_counter() - start, latencies, threading.active_count()
+    return asyncio.run(main())
+
+
+def report(name, elapsed, latencies, threads):
+    latencies = sorted(latencies)
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print("%-10s %8.1f req/s   p50 %7.1f ms   p95 %7.1f ms   p99 %7.1f ms   threads %d"
+          % (name, len(latencies) / elapsed, p(0.50), p(0.95), p(0.99), threads))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Admin vs AsyncAdmin throughput')
+    parser.add_argument('--docs', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=512)
+    parser.add_argument('--workers', type=int, default=8, help='AsyncAdmin db_workers')
+    parser.add_argument('--db-uri', default=None, help='MongoDB URI, MontyDB when omitted')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, 'bench.db')
+        for name, cls, runner in (('sync', minimus_admin.Admin, run_sync),
+                                  ('async', minimus_admin.AsyncAdmin, run_async)):
+            admin = make_admin(cls, args, db_file)
+            seed(admin, args.docs)
+            # every request is authenticated through the session
+            admin.session.data.update({'is_authenticated': True, 'user': {'username': 'bench'}})
+            report(name, *runner(admin, requests(args.requests), args.concurrency))
+
+
+if __name__ == '__main__':
+    main()
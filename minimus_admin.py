@@ -15,12 +15,38 @@ __author__ = 'Jeff Muday'
 __license__ = 'MIT'
 
 from minimus import Minimus, render_template, jsonify, parse_formvars, redirect, url_for, Session, abort
-from montydb import MontyClient, set_storage
+from montydb import MontyClient, MontyCollection, set_storage
+from montydb.errors import BulkWriteError as MontyBulkWriteError
+from montydb.errors import DuplicateKeyError as MontyDuplicateKeyError
+from montydb.types import bson as monty_bson
 import json
+import csv
+import io
 from pymongo import MongoClient
+from pymongo.collection import Collection
+from pymongo.monitoring import ConnectionPoolListener
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, PyMongoError
+try:
+    from pymongo import AsyncMongoClient
+except ImportError:
+    # pymongo < 4.9 has no native asyncio client
+    AsyncMongoClient = None
 from bson import ObjectId
+from bson.errors import InvalidId
+from urllib.parse import parse_qs, urlencode
 
+import asyncio
+import bisect
+import datetime
+import fnmatch
+import inspect
 import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import jinja2
 from passlib.context import CryptContext
 import functools
 from functools import wraps
@@ -37,9 +63,59 @@ def encrypt_password(password):
 def check_encrypted_password(password, hashed):
     return pwd_context.verify(password, hashed)
 
+def _verify_and_update(password, hashed):
+    """
+    _verify_and_update(password, hashed) - return (verified, new hash or None)
+    a new hash is made when passlib flags hashed with needs_update() or when its rounds
+    differ from pbkdf2_sha256__default_rounds, so the rounds can be raised or lowered
+    and stored hashes follow on the next login.
+    """
+    if not pwd_context.verify(password, hashed):
+        return False, None
+    handler = pwd_context.identify(hashed, resolve=True)
+    if pwd_context.needs_update(hashed) or handler.from_string(hashed).rounds != handler.default_rounds:
+        return True, encrypt_password(password)
+    return True, None
+
+class PasswordQueueFull(RuntimeError):
+    """raised when more password hashing jobs are pending than Admin(hash_queue_limit=...) allows"""
+
 # local session placeholder
 _admin_session = None
 
+# WSGI environment keys shared by Admin.wsgi_middleware() and the handlers
+_STREAMING = 'minimus_admin.streaming'
+_STREAM_RESPONSE = 'minimus_admin.response'
+
+# process-wide cache of compiled _meta schemas, Admin._schema_key() => (expires, schema)
+_schema_cache = {}
+
+# process-wide in-memory text indexes for MontyDB collections, Admin._cache_key() => _TextIndex
+_text_indexes = {}
+
+# file formats understood by Admin.import_documents()
+_IMPORT_FORMATS = ('ndjson', 'csv', 'json')
+
+# last column of a CSV export, the fields no other column holds as a JSON object
+_CSV_EXTRA = '_extra'
+
+# process-wide cache of collection statistics, Admin._cache_key() => (expires, stats)
+_stats_cache = {}
+
+# process-wide registry of database clients, see get_client()
+_clients = {}
+_clients_lock = threading.Lock()
+
+# serializes the get_user()/insert_one() pair of create_user() where no unique index exists
+_create_user_lock = threading.Lock()
+
+# WSGI environment keys set per request: the admin route name and the memoized session user
+_ROUTE = 'minimus_admin.route'
+_SESSION_USER = 'minimus_admin.user'
+
+# process-wide session load counters, route name => {'requests': n, 'loads': n}
+_session_loads = {}
+
 class Admin:
     """
     Allow for CRUD of data in database
@@ -55,12 +131,62 @@ class Admin:
                  admin_database='minimus_admin',
                  users_collection='minimus_users',
                  require_authentication=True,
+                 page_size=50,
+                 stats_ttl=60,
+                 schema_ttl=30,
+                 export_batch_size=1000,
+                 import_batch_size=1000,
+                 hash_workers=2,
+                 hash_queue_limit=16,
+                 login_ip_limit=(20, 60),
+                 login_user_limit=(5, 60),
+                 client_options=None,
+                 collection_routes=None,
+                 db_storage=None,
+                 db_storage_options=None,
+                 profile=False,
+                 profile_window=1000,
                  ):
-        """__init__() - initialize the administration area"""
+        """__init__() - initialize the administration area
+        :param page_size: default number of documents shown per page in view_collection
+        :param stats_ttl: seconds the collection statistics of view_all are cached
+        :param schema_ttl: seconds a compiled schema is cached, the bound on how long _meta changes
+            made by other processes go unnoticed
+        :param export_batch_size: documents read from the cursor and sent per chunk by export_collection
+        :param import_batch_size: documents written per insert_many() call by import_documents
+        :param hash_workers: threads that hash and verify passwords, off the request threads
+        :param hash_queue_limit: pending hash jobs (running or waiting) before logins get a 503
+        :param login_ip_limit: (attempts, seconds) login POSTs allowed per client address, a burst
+            of attempts refilled evenly over seconds, None disables the limit
+        :param login_user_limit: (attempts, seconds) login POSTs allowed per username, None disables
+        :param client_options: MongoClient keyword options, e.g. maxPoolSize, minPoolSize, maxIdleTimeMS,
+            waitQueueTimeoutMS, connectTimeoutMS, serverSelectionTimeoutMS, compressors='zstd,zlib'.
+            Admin instances (and the host app, see get_client()) with the same db_uri and options share one client
+        :param collection_routes: list of (pattern, backend) sending collections to other backends than
+            db_uri/db_file, pattern is a collection name or fnmatch pattern, backend a mongodb:// URI or a
+            MontyDB file, the first match wins. e.g. [('_meta', 'config.db'), ('minimus_users', 'config.db')]
+        :param db_storage: MontyDB engine used to create db_file, 'flatfile' (default), 'sqlite' or 'lightning'
+        :param db_storage_options: MontyDB engine settings, e.g. {'cache_modified': 100} for flatfile,
+            {'journal_mode': 'WAL', 'check_same_thread': False} for sqlite, {'map_size': 1 << 30} for lightning
+        :param profile: time every admin request split in db/transform/render phases and count its
+            database calls, the rolling percentiles are shown at url_prefix + '/_stats'
+        :param profile_window: most recent requests per route the percentiles are computed over
+        """
         global _db, _admin_session, _app
         self.app = app
         _app = app
         self.users_collection = users_collection
+        self.page_size = page_size
+        self.stats_ttl = stats_ttl
+        self.schema_ttl = schema_ttl
+        self.export_batch_size = export_batch_size
+        self.import_batch_size = import_batch_size
+        self._jinja = None
+        self.handlers = {}
+        self._hasher = _PasswordHasher(hash_workers, hash_queue_limit)
+        self._login_ip_buckets = _TokenBuckets(*login_ip_limit) if login_ip_limit else None
+        self._login_user_buckets = _TokenBuckets(*login_user_limit) if login_user_limit else None
+        self._profiler = _RouteProfiler(profile_window) if profile else None
         
         
         self.require_authentication = require_authentication
@@ -72,34 +198,66 @@ class Admin:
 
         ### set up the database ###
         if db_uri:
-            app.client = MongoClient(db_uri)
+            app.client = get_client(db_uri, **(client_options or {}))
         else:
-            set_storage(db_file)
             app.db_file = db_file
-            app.client = MontyClient(db_file)
+            app.client = get_client(db_file=db_file, storage=db_storage, **(db_storage_options or {}))
             
         app.db = app.client[admin_database]
+        if collection_routes:
+            routes = []
+            for pattern, backend in collection_routes:
+                if backend.startswith(('mongodb://', 'mongodb+srv://')):
+                    client = get_client(backend, **(client_options or {}))
+                else:
+                    client = get_client(db_file=backend)
+                routes.append((pattern, client[admin_database]))
+            app.db = RoutedDatabase(app.db, routes)
+        if profile:
+            app.db = _ProfiledDatabase(app.db)
         _db = app.db
+        # the unique username index is made on first use of the users (see _user_index), so Admin() does not wait for the database
+        self._unique_usernames = None
         
         # get path for templates
         dirname = os.path.dirname(__file__)
         app.template_dirs.append(os.path.join(dirname, 'templates'))
         
         ### Add the routes ###
-        app.add_route(url_prefix + '/login', self.login, methods=['GET','POST'], route_name="admin_login")
-        app.add_route(url_prefix + '/logout', self.logout, route_name='admin_logout')
+        self._add_route(url_prefix + '/login', self.login, methods=['GET','POST'], route_name="admin_login")
+        self._add_route(url_prefix + '/logout', self.logout, route_name='admin_logout')
         ####
-        app.add_route(url_prefix, self.view_all, route_name='admin_view_all')
-        app.add_route(url_prefix + '/view/<coll>', self.view_collection, route_name="admin_view_collection")
-        app.add_route(url_prefix + '/edit/<coll>/<id>', self.edit_fields, methods=['GET', 'POST'], route_name="admin_edit_fields")
-        app.add_route(url_prefix + '/edit_schema/<coll>/<id>', self.edit_schema, methods=['GET', 'POST'], route_name="admin_edit_schema")
-        app.add_route(url_prefix + '/edit_raw/<coll>/<id>', self.edit_json, methods=['GET', 'POST'], route_name="admin_edit_json")
-        app.add_route(url_prefix + '/delete/<coll>', self.delete_collection_prompt, methods=['GET','POST'], route_name="admin_delete_collection")
-        app.add_route(url_prefix + '/delete/<coll>/<id>', self.delete_collection_item, methods=['GET', 'POST'], route_name="admin_delete_collection_item")
-        app.add_route(url_prefix + '/add/<coll>', self.add_collection_item, methods=['GET', 'POST'], route_name="admin_add_collection_item")
-        app.add_route(url_prefix + '/add', self.add_mod_collection, methods=['GET','POST'], route_name="admin_add_collection")
-        app.add_route(url_prefix + '/modify/<coll>', self.add_mod_collection, methods=['GET', 'POST'], route_name="admin_mod_collection")
+        self._add_route(url_prefix, self.view_all, route_name='admin_view_all')
+        self._add_route(url_prefix + '/view/<coll>', self.view_collection, route_name="admin_view_collection")
+        self._add_route(url_prefix + '/edit/<coll>/<id>', self.edit_fields, methods=['GET', 'POST'], route_name="admin_edit_fields")
+        self._add_route(url_prefix + '/edit_schema/<coll>/<id>', self.edit_schema, methods=['GET', 'POST'], route_name="admin_edit_schema")
+        self._add_route(url_prefix + '/edit_raw/<coll>/<id>', self.edit_json, methods=['GET', 'POST'], route_name="admin_edit_json")
+        self._add_route(url_prefix + '/delete/<coll>', self.delete_collection_prompt, methods=['GET','POST'], route_name="admin_delete_collection")
+        self._add_route(url_prefix + '/delete/<coll>/<id>', self.delete_collection_item, methods=['GET', 'POST'], route_name="admin_delete_collection_item")
+        self._add_route(url_prefix + '/add/<coll>', self.add_collection_item, methods=['GET', 'POST'], route_name="admin_add_collection_item")
+        self._add_route(url_prefix + '/add', self.add_mod_collection, methods=['GET','POST'], route_name="admin_add_collection")
+        self._add_route(url_prefix + '/modify/<coll>', self.add_mod_collection, methods=['GET', 'POST'], route_name="admin_mod_collection")
+        self._add_route(url_prefix + '/export/<coll>', self.export_collection, route_name="admin_export")
+        self._add_route(url_prefix + '/bulk/<coll>', self.bulk_collection, methods=['POST'], route_name="admin_bulk")
+        self._add_route(url_prefix + '/import/<coll>', self.import_collection, methods=['GET', 'POST'], route_name="admin_import")
+        self._add_route(url_prefix + '/indexes/<coll>', self.view_indexes, methods=['GET', 'POST'], route_name="admin_indexes")
+        self._add_route(url_prefix + '/_stats', self.view_stats, route_name="admin_stats")
         
+    def _add_route(self, path, f, methods=['GET'], route_name=None):
+        """
+        _add_route(path, f, methods, route_name) - register an admin route whose handler
+        tags the WSGI environment with its route name before it runs
+        """
+        @wraps(f)
+        def handler(env, **kwargs):
+            env[_ROUTE] = route_name
+            counts = _session_loads.setdefault(route_name, {'requests': 0, 'loads': 0})
+            counts['requests'] += 1
+            if self._profiler is None:
+                return f(env, **kwargs)
+            return self._profiler.run(route_name, f, env, kwargs)
+        self.app.add_route(path, handler, methods=methods, route_name=route_name)
+        self.handlers[route_name] = handler
         
     def login(self, env, filename=None, next=None):
         """
@@ -114,10 +272,15 @@ class Admin:
             fields = parse_formvars(env)
             username = fields.get('username')
             password = fields.get('password')
-            user = self.get_user(username)
-            if self.authenticate(username, password):
+            if not self.login_allowed(env.get('REMOTE_ADDR'), username):
+                return abort(429)
+            try:
+                user, reason = self.verify_user(username, password)
+            except PasswordQueueFull:
+                return abort(503)
+            if user:
                 user['_id'] = str(user['_id'])
-                self.login_user(user)
+                self.login_user(user, env)
                 next = 'admin_view_all' if next is None else next
                 return redirect(url_for(next))
             
@@ -128,29 +291,72 @@ class Admin:
         # render external login
         return render_template(filename)
     
-    def login_user(self, user):
+    def login_allowed(self, ip, username):
+        """
+        login_allowed(ip, username) - take a token from the client address and username buckets
+            call before any password hashing, over-limit attempts cost nothing
+            :param ip: client address (REMOTE_ADDR) or None
+            :param username: the username tried or None
+            :return: True if the attempt may proceed, False if it is throttled
+        """
+        if self._login_ip_buckets and ip and not self._login_ip_buckets.take(ip):
+            return False
+        if self._login_user_buckets and username and not self._login_user_buckets.take(username):
+            return False
+        return True
+
+    def login_user(self, user, env=None):
         """
         login_user() - login the user
             sets the Session to the authenticated user
             :param user: the user to login
+            :param env: the WSGI environment, its memoized session user is updated
         """
         self.session.connect()
+        _count_session_load(env)
         self.session.data['is_authenticated'] = True
         self.session.data['user'] = user
         self.session.save()
+        if env is not None:
+            env[_SESSION_USER] = user
         
-    def login_check(self):
+    def login_check(self, env=None):
         """
-        login_check() - if require_authentication return user else None
+        login_check(env=None) - if require_authentication return user else None
+            the session is loaded once per request, the user is memoized on the env
+            :param env: the WSGI environment of the current request
         """
         if self.require_authentication:
-            self.session.connect()
-            if self.session.data.get('is_authenticated'):
-                return self.session.data['user']
-            return None
+            return _session_user(self.session, env)
         else:
             return True
 
+    def pool_stats(self):
+        """
+        pool_stats() - connection pool metrics of the MongoDB client, None for MontyDB
+            {'checkouts', 'failed', 'in_use', 'wait_ms': {'mean', 'p50', 'p95', 'p99', 'max'}},
+            the percentiles cover the most recent checkouts
+        """
+        listener = _pool_listener(self.app.client)
+        return listener.stats() if listener else None
+
+    def view_stats(self, env):
+        """
+        view_stats(env) - request timing per route (with profile=True), session loads and pool metrics
+        """
+        if not self.login_check(env):
+            return redirect(url_for('admin_login'))
+        routes = self._profiler.stats() if self._profiler else None
+        return render_template('admin/stats.html', routes=routes, phases=_PROFILE_PHASES,
+                               session_loads=self.session_loads(), pool=self.pool_stats())
+
+    def session_loads(self):
+        """
+        session_loads() - return {route name: {'requests': n, 'loads': n}}, the number of
+            requests served and session store loads caused by each admin route
+        """
+        return {route: dict(counts) for route, counts in _session_loads.items()}
+
     def login_required(self, f):
         """login_required(f) is a decorator for Flask routes that require a login
         : param {f} : function to decorate
@@ -158,8 +364,8 @@ class Admin:
         """
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            self.session.connect()
-            if 'user' not in self.session.data:
+            env = args[0] if args and isinstance(args[0], dict) else None
+            if not _session_user(self.session, env):
                 return redirect(self.app.url_for('admin_login'))
             return f(*args, **kwargs)
         return decorated_function
@@ -168,57 +374,522 @@ class Admin:
         """
         login_check(env, next) - if require_authentication return user else None
         """
-        self.logout_user()
+        self.logout_user(env)
         next = next if next else '/'
         return redirect(next)
     
-    def logout_user(self):
-        """logout_user() - pops the user out of the session"""
+    def logout_user(self, env=None):
+        """logout_user(env=None) - pops the user out of the session"""
         self.session.connect()
+        _count_session_load(env)
         if 'is_authenticated' in self.session.data:
             self.session.data['is_authenticated'] = False
         if 'user' in self.session.data:   
             self.session.data.pop('user')
         self.session.save()
+        if env is not None:
+            env[_SESSION_USER] = None
     
 
     def view_all(self, env):
         """
         view_all(env) - view all collections in the database
         """
-        if not self.login_check():
+        if not self.login_check(env):
             return redirect(url_for('admin_login'))
         collections = self.app.db.list_collection_names()
-        return render_template('admin/view_all.html', collections=collections)
+        stats = {coll: self.collection_stats(coll) for coll in collections if coll != '_meta'}
+        return render_template('admin/view_all.html', collections=collections, stats=stats)
+
+    def collection_stats(self, coll):
+        """
+        collection_stats(coll) - document count, sizes and last insert time of a collection,
+        cached for stats_ttl seconds (see _collection_stats)
+        """
+        key = self._cache_key(coll)
+        now = time.monotonic()
+        cached = _stats_cache.get(key)
+        if cached is None or cached[0] < now:
+            cached = (now + self.stats_ttl, _collection_stats(self.app.db, coll))
+            _stats_cache[key] = cached
+        return cached[1]
     
     def view_collection(self, env, coll):
-        """view_all(env, coll) - view a specific collection in the database"""
-        if not self.login_check():
-            return redirect(url_for('admin_login'))        
-        data = list(self.app.db[coll].find())
-        schema = self.app.db['_meta'].find_one({'name':coll})
-        # santize id to string
-        for doc in data:
-            doc['_id'] = str(doc['_id'])
-            
+        """view_collection(env, coll) - view one page of a specific collection in the database
+        query parameters:
+            after=<_id> - show the page following this document id
+            before=<_id> - show the page preceding this document id
+            size=<n> - number of documents per page (default Admin.page_size)
+            sort=<field>, dir=<asc|desc> - order of the documents (default by _id)
+            q.<field>=<value> - only show documents where field equals value (dotted names allowed)
+            search=<words> - only show documents containing all of the words (see text_query)
+            explain=1 - show how the database runs the query of this page instead (see explain_query)
+        """
+        if not self.login_check(env):
+            return redirect(url_for('admin_login'))
+        params = _query_params(env)
+        if params.get('explain'):
+            return self.explain_query(env, coll, params)
+        size = _page_size(params.get('size'), self.page_size)
+        schema = self.get_schema(coll)
+        # a list-view only shows the '^' fields, so only fetch those
+        projection = schema['projection'] if schema else None
+        query = self.collection_query(coll, params, size)
+        sort = _query_sort(params)
+        base_url, link_params = _view_links(coll, params)
+
+        streaming = bool(env.get(_STREAMING))
+        if streaming:
+            # documents go from the cursor to the client as the template renders,
+            # the page links are filled in once the page has been read
+            page = _page_links(base_url, [], False, False, link_params)
+            data = _keyset_stream(self.app.db[coll], page, base_url, after=params.get('after'),
+                                  before=params.get('before'), size=size, query=query,
+                                  projection=projection, sort=sort, params=link_params)
+            render = functools.partial(self.stream_template, env)
+        else:
+            try:
+                data, has_prev, has_next = _keyset_page(self.app.db[coll], after=params.get('after'),
+                                                        before=params.get('before'), size=size, query=query,
+                                                        projection=projection, sort=sort)
+            except Exception as e:
+                # e.g. a search on MongoDB without a text index
+                return jsonify({'status': 'error', 'message': 'Admin view_collection(), ' + str(e)})
+            page = _page_links(base_url, data, has_prev, has_next, link_params)
+            # santize id to string
+            for doc in data:
+                doc['_id'] = str(doc['_id'])
+            render = render_template
+        return self._render_collection(render, coll, schema, data, page, streaming, params)
+
+    def _render_collection(self, render, coll, schema, data, page, streaming, params):
+        """_render_collection(render, coll, schema, data, page, streaming, params) - render a page of view_collection"""
+        base_url, link_params = _view_links(coll, params)
+        explain_url = base_url + '?' + urlencode(dict(params, explain=1))
         if schema:
             # check for list-view
-            if '^' in schema['schema']:
-                docs = []
-                for raw_doc in data:
-                    this_doc = _schema_transform(raw_doc, schema)
-                    docs.append(this_doc)
-                return render_template('admin/view_collection_list.html', docs=docs, coll=coll)
+            if schema['projection']:
+                docs = (_schema_transform(raw_doc, schema) for raw_doc in data)
+                return render('admin/view_collection_list.html', docs=docs, coll=coll, schema=schema,
+                              page=page, streaming=streaming, params=params, base_url=base_url,
+                              query_string=urlencode(link_params), explain_url=explain_url)
+
+        return render('admin/view_collection.html', coll=coll, data=data, schema=schema, page=page,
+                      streaming=streaming, params=params, base_url=base_url,
+                      query_string=urlencode(link_params), explain_url=explain_url)
+
+    def explain_query(self, env, coll, params):
+        """
+        explain_query(env, coll, params) - render how the database runs the page query of view_collection
+        (same filter, sort, projection and page range) with MongoDB's explain(): the winning plan, the
+        index used, keys and documents examined and the execution time.  MontyDB has no query planner,
+        the query is run and timed and reported as the collection scan it is.
+        """
+        size = _page_size(params.get('size'), self.page_size)
+        schema = self.get_schema(coll)
+        projection = schema['projection'] if schema else None
+        collection = self.app.db[coll]
+        try:
+            query = self.collection_query(coll, params, size)
+            query, spec = _keyset_query(collection, params.get('after'), params.get('before'),
+                                        query, _query_sort(params))
+            report = _explain_report(collection, query, projection, spec, size + 1)
+        except Exception as e:
+            return jsonify({'status': 'error', 'message': 'Admin explain_query(), ' + str(e)})
+        back = url_for('admin_view_collection', coll=coll)
+        link_params = {k: v for k, v in params.items() if k != 'explain'}
+        if link_params:
+            back += '?' + urlencode(link_params)
+        return render_template('admin/explain.html', coll=coll, report=report, back=back)
+
+    def collection_query(self, coll, params, size=None):
+        """
+        collection_query(coll, params, size=None) - the filter selected by the q.<field> and search
+        query parameters of view_collection
+        : param {size} : page size, a MontyDB search then only selects the page of after/before (see text_page)
+        : return : filter dict
+        """
+        query = _query_filter(params)
+        if params.get('search'):
+            if size and _is_monty(self.app.db[coll]):
+                text = self.text_page(coll, params, size)
+            else:
+                text = self.text_query(coll, params['search'])
+            query = {'$and': [query, text]} if query else text
+        return query
+
+    def export_collection(self, env, coll):
+        """
+        export_collection(env, coll) - download a collection as NDJSON or CSV
+        query parameters:
+            format=<ndjson|csv> - the file format (default ndjson)
+            q.<field>, search, sort, dir - select and order the documents as in view_collection
+        Documents are read from the cursor and sent in batches of export_batch_size, so memory use
+        does not depend on the collection size.  CSV columns follow the collection schema when it
+        has one, the other fields of a document go to a last _extra column (see _csv_chunks).  Exports are streamed, so the application must be wrapped by wsgi_middleware().
+        """
+        if not self.login_check(env):
+            return abort(401)
+        if not env.get(_STREAMING):
+            return jsonify({'status': 'error', 'message': 'Admin export_collection(), exports need Admin.wsgi_middleware()'})
+        params = _query_params(env)
+        fmt = params.get('format', 'ndjson')
+        if fmt not in ('ndjson', 'csv'):
+            return jsonify({'status': 'error', 'message': 'Admin export_collection(), unknown format ' + fmt})
 
-        return render_template('admin/view_collection.html', coll=coll, data=data, schema=schema)
+        collection = self.app.db[coll]
+        matches = None
+        if params.get('search') and _is_monty(collection):
+            # keep the matches of the text index while reading, a $in of every match costs a test per match
+            matches = self._text_index(coll).search(_words(params['search']))
+            cursor = collection.find(_query_filter(params))
+        else:
+            cursor = collection.find(self.collection_query(coll, params))
+        sort = _query_sort(params)
+        if sort:
+            cursor = cursor.sort([sort])
+        if not _is_monty(collection):
+            cursor = cursor.batch_size(self.export_batch_size)
+        docs = cursor if matches is None else (doc for doc in cursor if doc['_id'] in matches)
+
+        if fmt == 'csv':
+            schema = self.get_schema(coll)
+            columns = ['_id'] + [f['name'] for f in schema['fields']] if schema else None
+            chunks = _csv_chunks(docs, columns, self.export_batch_size)
+            content_type = 'text/csv; charset=utf-8'
+        else:
+            chunks = _ndjson_chunks(docs, self.export_batch_size)
+            content_type = 'application/x-ndjson'
+        headers = [('Content-Type', content_type),
+                   ('Content-Disposition', 'attachment; filename="%s.%s"' % (coll, fmt))]
+        env[_STREAM_RESPONSE] = StreamingResponse(chunks, headers=headers)
+        return ''
+
+    def bulk_collection(self, env, coll):
+        """
+        bulk_collection(env, coll) - delete, set or unset a field on many documents with one write
+        form fields:
+            action - 'delete', 'set' or 'unset'
+            scope - 'selected' for the comma separated _id list in ids, 'filter' for all documents
+                    matching query (the query string of the collection view, see collection_query)
+                    or 'all' for the whole collection; an empty filter is refused, 'all' has to be chosen
+            field, value - the field to set or unset, value is converted to the schema type
+        """
+        if not self.login_check(env):
+            return abort(401)
+        fields = parse_formvars(env)
+        action = fields.get('action')
+        query_string = fields.get('query') or ''
+        collection = self.app.db[coll]
+        try:
+            if fields.get('scope') == 'all':
+                queries = [{}]
+            elif fields.get('scope') == 'filter':
+                params = {k: v[0] for k, v in parse_qs(query_string).items()}
+                if params.get('search') and _is_monty(collection):
+                    queries = self._text_batches(coll, params)
+                else:
+                    queries = [self.collection_query(coll, params)]
+                if queries == [{}]:
+                    raise ValueError("the filter is empty, choose 'on all documents' to change the whole collection")
+            else:
+                ids = [_to_object_id(id.strip(), collection) for id in (fields.get('ids') or '').split(',') if id.strip()]
+                if not ids:
+                    raise ValueError("no documents selected")
+                queries = [{'_id': {'$in': ids}}]
+
+            if action == 'delete':
+                result = {'deleted': sum(collection.delete_many(query).deleted_count for query in queries)}
+            elif action in ('set', 'unset'):
+                name = (fields.get('field') or '').strip()
+                if not name or name.startswith('$') or name == '_id':
+                    raise ValueError("invalid field name %r" % name)
+                if action == 'set':
+                    update = {'$set': {name: self._coerce_value(coll, name, fields.get('value') or '')}}
+                else:
+                    update = {'$unset': {name: ''}}
+                result = {'matched': 0, 'modified': 0}
+                for query in queries:
+                    outcome = collection.update_many(query, update)
+                    result['matched'] += outcome.matched_count
+                    result['modified'] += outcome.modified_count
+            else:
+                raise ValueError("unknown action %r" % action)
+        except Exception as e:
+            return jsonify({'status': 'error', 'message': 'Admin bulk_collection(), ' + str(e)})
+
+        # the in-memory text index is rebuilt on the next search
+        self.collection_changed(coll)
+        back = url_for('admin_view_collection', coll=coll)
+        if query_string:
+            back += '?' + query_string
+        return render_template('admin/bulk_result.html', coll=coll, action=action, result=result, back=back)
+
+    def _coerce_value(self, coll, name, value):
+        """_coerce_value(coll, name, value) - convert a form value to the schema type of field name"""
+        schema = self.get_schema(coll)
+        if not schema:
+            return value
+        doc = _unflatten({name: value})
+        _coerce_document(doc, schema)
+        return _get_dotted_value(name, doc)
+
+    def import_collection(self, env, coll):
+        """
+        import_collection(env, coll) - GET shows the upload page, POST loads the request body
+        (the raw file, not a multipart form) into the collection with import_documents()
+        query parameters:
+            format=<ndjson|csv|json> - the file format (default ndjson)
+            batch=<n> - documents per insert_many() call (default import_batch_size)
+        : return : JSON report of the import
+        """
+        if not self.login_check(env):
+            return abort(401)
+        if env.get('REQUEST_METHOD') != 'POST':
+            return render_template('admin/import.html', coll=coll)
+        params = _query_params(env)
+        fmt = params.get('format', 'ndjson')
+        if fmt not in _IMPORT_FORMATS:
+            return jsonify({'status': 'error', 'message': 'Admin import_collection(), unknown format ' + fmt})
+        try:
+            length = int(env.get('CONTENT_LENGTH') or 0)
+            body = io.TextIOWrapper(io.BufferedReader(_RequestBody(env['wsgi.input'], length)),
+                                    encoding='utf-8', newline='')
+            batch_size = _page_size(params.get('batch'), self.import_batch_size, maximum=100000)
+            report = self.import_documents(coll, body, fmt, batch_size=batch_size)
+        except Exception as e:
+            return jsonify({'status': 'error', 'message': 'Admin import_collection(), ' + str(e)})
+        report['status'] = 'ok'
+        return jsonify(report)
+
+    def import_documents(self, coll, fp, fmt, batch_size=None, progress=None):
+        """
+        import_documents(coll, fp, fmt, batch_size=None, progress=None) - bulk load documents into a collection
+        : param {fp} : text file object (opened with newline='' for CSV)
+        : param {fmt} : 'ndjson', 'csv' or 'json' (a JSON array of documents)
+        : param {batch_size} : documents per insert_many() call, default import_batch_size
+        : param {progress} : optional callable progress(report), called after each batch
+        : return : report dict {'rows', 'inserted', 'failed', 'errors': [{'row', 'message'}, ...]}
+        The file is parsed as it is read, values are coerced to the types of the collection schema
+        and every batch is written with one unordered insert_many().  A bad row is reported and
+        skipped, it does not stop the load.  Only the first 100 errors are listed.
+        """
+        if fmt not in _IMPORT_FORMATS:
+            raise ValueError("Admin.import_documents() - unknown format " + str(fmt))
+        batch_size = batch_size or self.import_batch_size
+        collection = self.app.db[coll]
+        schema = self.get_schema(coll)
+        report = {'rows': 0, 'inserted': 0, 'failed': 0, 'errors': []}
+        rows = {'ndjson': _ndjson_rows, 'csv': _csv_rows, 'json': _json_array_rows}[fmt](fp)
+        batch = []
+        try:
+            for row, doc in rows:
+                report['rows'] = row
+                try:
+                    if isinstance(doc, Exception):
+                        raise doc
+                    if not isinstance(doc, dict):
+                        raise ValueError("not a JSON object")
+                    if schema:
+                        _coerce_document(doc, schema)
+                    if '_id' in doc:
+                        doc['_id'] = _to_object_id(doc['_id'], collection)
+                except Exception as e:
+                    _import_error(report, row, str(e))
+                    continue
+                batch.append((row, doc))
+                if len(batch) >= batch_size:
+                    _insert_batch(collection, batch, report)
+                    batch = []
+                    if progress:
+                        progress(report)
+        except (ValueError, csv.Error) as e:
+            # the file itself is broken (e.g. an unterminated JSON array), keep what was loaded
+            _import_error(report, report['rows'] + 1, str(e))
+        if batch:
+            _insert_batch(collection, batch, report)
+            if progress:
+                progress(report)
+        # the in-memory text index is rebuilt on the next search
+        self.collection_changed(coll)
+        return report
+
+    def text_query(self, coll, text):
+        """
+        text_query(coll, text) - filter for the documents of a collection containing every word of text.
+        MongoDB uses $text (the collection needs a text index, see view_indexes).  MontyDB has no text
+        search, so an in-memory inverted index of the collection is built on the first search and then
+        kept up to date by the admin write paths (see text_changed).  There the filter is a $in of every
+        match, which MontyDB tests against each document; pages of a view are read with text_page().
+        : return : filter dict
+        """
+        words = _words(text)
+        collection = self.app.db[coll]
+        if not _is_monty(collection):
+            # quoting each word makes $text require all of them
+            return {'$text': {'$search': ' '.join('"%s"' % word for word in words)}}
+        return {'_id': {'$in': list(self._text_index(coll).search(words))}}
 
+    def text_page(self, coll, params, size):
+        """
+        text_page(coll, params, size) - filter for one page of a MontyDB search of view_collection.
+        The matches of the in-memory text index are narrowed by the q.<field> filter, ordered on the
+        sort of the page and cut to the size + 1 following after (or preceding before) in Python, so
+        only the documents of the page are fetched (see _text_window).
+        : return : filter dict
+        """
+        matches = self._text_index(coll).search(_words(params['search']))
+        window = _text_window(self.app.db[coll], matches, _query_filter(params), _query_sort(params),
+                              params.get('after'), params.get('before'), size)
+        return _ids_filter(window)
+
+    def _text_batches(self, coll, params):
+        """
+        _text_batches(coll, params) - filters for all documents of a MontyDB search, page_size
+        _ids at a time, so bulk writes never test a $in of every match against each document
+        : return : list of filter dict
+        """
+        matches = self._text_index(coll).search(_words(params['search']))
+        query = _query_filter(params)
+        if query:
+            matches = [doc['_id'] for doc in self.app.db[coll].find(query, {'_id': 1}) if doc['_id'] in matches]
+        ids = sorted(matches, key=_sort_value)
+        return [_ids_filter(ids[i:i + self.page_size]) for i in range(0, len(ids), self.page_size)]
+
+    def _text_index(self, coll):
+        """_text_index(coll) - the in-memory text index of a MontyDB collection, built on first use"""
+        key = self._cache_key(coll)
+        index = _text_indexes.get(key)
+        if index is None:
+            index = _TextIndex()
+            for doc in self.app.db[coll].find():
+                index.add(doc)
+            _text_indexes[key] = index
+        return index
+
+    def collection_changed(self, coll, id=None):
+        """
+        collection_changed(coll, id=None) - update the caches after a write by the admin: the text
+        index (see text_changed) and, when _meta was edited as a collection, the compiled schemas
+        : param {id} : _id of the inserted, updated or deleted document, None for many or all of them
+        """
+        if coll == '_meta':
+            # the record may have been renamed, so drop every schema of this database
+            _invalidate_schema(self._cache_key('_meta'))
+        self.text_changed(coll, id)
+
+    def text_changed(self, coll, id=None):
+        """
+        text_changed(coll, id=None) - update the in-memory text index of a collection after a write
+        : param {id} : _id of the inserted, updated or deleted document, None if the collection was dropped
+        """
+        key = self._cache_key(coll)
+        index = _text_indexes.get(key)
+        if index is None:
+            # not searched yet, it will be built from the current data
+            return
+        if id is None:
+            _text_indexes.pop(key, None)
+            return
+        doc = self.app.db[coll].find_one({'_id': id})
+        if doc is None:
+            index.remove(id)
+        else:
+            index.add(doc)
+
+    def stream_template(self, env, filename, **context):
+        """
+        stream_template(env, filename, **context) - render a template incrementally.
+        The rendered chunks are handed to wsgi_middleware() through the WSGI environment,
+        so generators passed in the context are consumed while the response is sent.
+        : return : empty string, the actual body is sent by wsgi_middleware()
+        """
+        if self._jinja is None:
+            # query parameters are echoed back into the pages, so escape every value
+            self._jinja = jinja2.Environment(loader=jinja2.FileSystemLoader(self.app.template_dirs),
+                                             autoescape=jinja2.select_autoescape())
+            self._jinja.globals['url_for'] = url_for
+        stream = self._jinja.get_template(filename).stream(**context)
+        # group the many small template fragments into fewer writes
+        stream.enable_buffering(64)
+        env[_STREAM_RESPONSE] = StreamingResponse(stream)
+        return ''
+
+    def wsgi_middleware(self, wsgi_app):
+        """
+        wsgi_middleware(wsgi_app) - wrap a WSGI application so admin pages are streamed
+        to the client instead of being rendered to one string first.
+        : param {wsgi_app} : the WSGI application (usually the Minimus app)
+        : return : the wrapped WSGI application
+        example
+        application = admin.wsgi_middleware(app)
+        """
+        def middleware(environ, start_response):
+            environ[_STREAMING] = True
+            started = []
+
+            def admin_start_response(status, headers, exc_info=None):
+                started.append(status)
+                response = environ.get(_STREAM_RESPONSE)
+                if response is not None:
+                    status, headers = response.status, response.headers
+                if exc_info:
+                    return start_response(status, headers, exc_info)
+                return start_response(status, headers)
+
+            result = wsgi_app(environ, admin_start_response)
+            response = environ.get(_STREAM_RESPONSE)
+            if response is None:
+                return result
+            # discard the placeholder body of the handler
+            if hasattr(result, 'close'):
+                result.close()
+            if not started:
+                start_response(response.status, response.headers)
+            return response
+        return middleware
+
+
+    def get_schema(self, coll):
+        """
+        get_schema(coll) - return the compiled schema of a collection (see _compile_schema)
+        the _meta record is read and parsed once, then served from a process-wide cache
+        until the admin writes to _meta (see collection_changed) or for schema_ttl seconds.
+        : return : compiled schema or None if the collection has no schema
+        """
+        key = self._schema_key(coll)
+        cached = _schema_cache.get(key)
+        if cached is None or cached[0] < time.monotonic():
+            rec = self.app.db['_meta'].find_one({'name':coll})
+            cached = (time.monotonic() + self.schema_ttl, _compile_schema(rec) if rec else None)
+            _schema_cache[key] = cached
+        return cached[1]
+
+    def _cache_key(self, coll):
+        """
+        _cache_key(coll) - key of coll in the process-wide caches, (backend, database name, collection name)
+            the backend is the db_uri or absolute db_file that holds coll, so Admins on different
+            databases of the same name never share entries
+        """
+        database = self.app.db
+        if isinstance(database, _ProfiledDatabase):
+            database = database.wrapped
+        if isinstance(database, RoutedDatabase):
+            database = database.database_for(coll)
+        # clients made by get_client() know their backend, any other one is told apart by identity
+        client = database.client
+        return (getattr(client, '_minimus_backend', id(client)), database.name, coll)
+
+    def _schema_key(self, coll):
+        """_schema_key(coll) - key of the compiled schema of coll, which lives in the _meta collection"""
+        return self._cache_key('_meta') + (coll,)
 
     def edit_json(self, env, coll, id):
         """render a specific record as JSON"""
-        if not self.login_check():
+        if not self.login_check(env):
             return abort(401)        
         try:
-            key = {'_id': ObjectId(id)}
+            key = {'_id': _object_id(id, self.app.db[coll])}
             data = self.app.db[coll].find_one(key)
         except Exception as e:
             return jsonify({'status': 'error', 'message': 'Admin edit_json(), ' + str(e)})
@@ -230,10 +901,10 @@ class Admin:
                 data = json.loads(text_format)
                 #self.app.db[coll].update_one(key, {'$set': data})
                 self.app.db[coll].replace_one(key, data)
+                self.collection_changed(coll, key['_id'])
             except Exception as e:
                 return jsonify({'status': 'error', 'message': 'Admin edit_json, ' + str(e)})
-            finally:
-                return redirect(url_for('admin_view_collection', coll=coll))
+            return redirect(url_for('admin_view_collection', coll=coll))
 
         else:
             # render the JSON
@@ -246,11 +917,11 @@ class Admin:
         """edit_fields(env, coll, id) - render a specific record as fields
 		** combine with edit_schema() during refactor
 		"""
-        if not self.login_check():
+        if not self.login_check(env):
             return abort(401)        
         try:
             if not id == 'new':
-                key = {'_id': ObjectId(id)}
+                key = {'_id': _object_id(id, self.app.db[coll])}
                 old_data = self.app.db[coll].find_one(key)
             else:
                 old_data = {}
@@ -277,14 +948,15 @@ class Admin:
                 # write the data
                 if id == 'new':
                     id = self.app.db[coll].insert_one(data).inserted_id
+                    self.collection_changed(coll, id)
                 else:
                     self.app.db[coll].update_one(key, {'$set': data})
+                    self.collection_changed(coll, key['_id'])
                 data['_id'] = id
                 
             except Exception as e:
                 return jsonify({'status': 'error', 'message': 'Admin edit_fields(), ' + str(e)})
-            finally:
-                return redirect(url_for('admin_view_collection', coll=coll))
+            return redirect(url_for('admin_view_collection', coll=coll))
         else:
             # view the data
             try:
@@ -302,7 +974,7 @@ class Admin:
         coll - collection name
         id - the database id
         """
-        if not self.login_check():
+        if not self.login_check(env):
             return abort(401)
 
         # get the data
@@ -310,13 +982,13 @@ class Admin:
             data = {'_id': 'new'}
         else:
             try:
-                key = {'_id': ObjectId(id)}
+                key = {'_id': _object_id(id, self.app.db[coll])}
             except Exception as e:
                 return jsonify({'status': 'error', 'message': 'Admin edit_schema(), ' + str(e)})
 
         # view the data
         try:
-            schema = self.app.db['_meta'].find_one({'name':coll})
+            schema = self.get_schema(coll)
             if not id == 'new':
                 # get existing data
                 data = self.app.db[coll].find_one(key)
@@ -325,12 +997,11 @@ class Admin:
             data['_id'] = str(data['_id'])
         except Exception as e:
             return jsonify({'status': 'error', 'message': 'Admin edit_schema(), ' + str(e)})
-        finally:
-            return render_template('admin/edit_schema.html', coll=coll, fields=fields, id=data['_id'])
+        return render_template('admin/edit_schema.html', coll=coll, fields=fields, id=data['_id'])
         
     def add_collection_item(self, env, coll):
         """Add a new item to the collection, raw JSON"""
-        if not self.login_check():
+        if not self.login_check(env):
             return abort(401)        
         if env.get('REQUEST_METHOD') == 'GET':    
             return render_template('admin/add_json.html', coll=coll)
@@ -342,19 +1013,20 @@ class Admin:
             except:
                 data = cook_data(raw)
             self.app.db[coll].insert_one(data)
+            self.collection_changed(coll, data['_id'])
             data['_id'] = str(data['_id'])
         return redirect(url_for('admin_view_collection', coll=coll))
     
     def add_mod_collection(self, env, coll=None):
         """Add or Modify a collection"""
-        if not self.login_check():
+        if not self.login_check(env):
             return abort(401)        
         fields = {}
         key = None
         if coll:
             # find record of schema
             fields['name'] = coll
-            rec = self.app.db['_meta'].find_one({'name':coll})
+            rec = self.get_schema(coll)
             if rec:
                 key = {'_id': rec['_id']}
                 fields['schema'] = rec['schema']
@@ -374,6 +1046,10 @@ class Admin:
                 else:
                     # it's new insert
                     self.app.db['_meta'].insert_one(meta)
+                _invalidate_schema(self._schema_key(name))
+                if coll:
+                    # a renamed schema no longer applies to the old name
+                    _invalidate_schema(self._schema_key(coll))
                 
             # create the collection if it doesn't exist
             if not name in self.app.db.list_collection_names():
@@ -384,36 +1060,87 @@ class Admin:
         
         return render_template('admin/add_mod_collection.html', fields=fields)
     
+    def view_indexes(self, env, coll):
+        """
+        view_indexes(env, coll) - list, create and drop the indexes of a collection.
+        Fields marked with '#' in the collection schema can all be indexed in one step.
+        Each index is built on (field, _id), which is the order view_collection pages in
+        when sorting on that field.
+        """
+        if not self.login_check(env):
+            return abort(401)
+        collection = self.app.db[coll]
+        schema = self.get_schema(coll)
+        schema_fields = [f['name'] for f in schema['fields'] if f['indexed']] if schema else []
+        supported = _supports_indexes(collection)
+
+        if env.get('REQUEST_METHOD') == 'POST' and supported:
+            fields = parse_formvars(env)
+            action = fields.get('action')
+            try:
+                if action == 'create_schema':
+                    for name in schema_fields:
+                        collection.create_index(_sort_index_keys(name))
+                elif action == 'create' and fields.get('field'):
+                    name = fields.get('field').strip()
+                    if fields.get('unique') == 'on':
+                        collection.create_index([(name, 1)], unique=True)
+                    else:
+                        collection.create_index(_sort_index_keys(name))
+                elif action == 'create_text':
+                    # one text index over every string field, used by the view_collection search
+                    collection.create_index([('$**', 'text')])
+                elif action == 'drop' and fields.get('name') not in (None, '_id_'):
+                    collection.drop_index(fields.get('name'))
+            except Exception as e:
+                return jsonify({'status': 'error', 'message': 'Admin view_indexes(), ' + str(e)})
+            return redirect(url_for('admin_indexes', coll=coll))
+
+        indexes = []
+        if supported:
+            sizes = _index_sizes(self.app.db, coll)
+            for name, info in collection.index_information().items():
+                indexes.append({'name': name, 'keys': info['key'], 'unique': info.get('unique', False),
+                                'size': sizes.get(name)})
+        # schema fields without an index that starts with them
+        leading = [index['keys'][0][0] for index in indexes]
+        missing = [name for name in schema_fields if name not in leading]
+        return render_template('admin/indexes.html', coll=coll, indexes=indexes, schema_fields=schema_fields,
+                               missing=missing, supported=supported)
+
     def delete_collection_item(self, env, coll, id):
-        if not self.login_check():
+        if not self.login_check(env):
             return abort(401)        
         try:
-            key = {'_id': ObjectId(id)}
+            key = {'_id': _object_id(id, self.app.db[coll])}
             old_data = self.app.db[coll].find_one(key)
         except Exception as e:
             return jsonify({'status': 'error', 'message': 'deleteJSON non-existent id, ' + str(e)})
     
         self.app.db[coll].delete_one(key)
+        self.collection_changed(coll, key['_id'])
         return redirect(url_for('admin_view_collection', coll=coll))
     
     def delete_collection_prompt(self, env, coll):
         """delete collection with prompt"""
-        if not self.login_check():
+        if not self.login_check(env):
             return abort(401)        
         fields = {}
         if env.get('REQUEST_METHOD') == 'POST':
             fields = parse_formvars(env)
             if fields.get('name') == coll and fields.get('agree') == 'on':
                 self.app.db[coll].drop()
+                self.collection_changed(coll)
             return redirect(url_for('admin_view_all'))
                 
         return render_template('admin/delete_collection_prompt.html', fields=fields, coll=coll)
     
     def delete_collection(self, env, coll):
         """DANGER -- this method will delete a collection immediately"""
-        if not self.login_check():
+        if not self.login_check(env):
             return abort(401)        
         self.app.db[coll].drop()
+        self.collection_changed(coll)
         return redirect(url_for('admin_view_all'))
     
     def unit_tests(self):
@@ -439,6 +1166,7 @@ class Admin:
         """
         if _db is None:
             raise ValueError("Database not initialized!")
+        self._user_index()
         # first try the username--
         user = None
         if username:
@@ -456,16 +1184,53 @@ class Admin:
         example
         create_user('joe','secret',display_name='Joe Smith',is_editor=True)
         """
-        user = self.get_user(username=username)
-        if user:
-            # user exists, return failure
-            return False
-        # build a user record from scratch
-        user = {'username':username, 'password': encrypt_password(password)}
-        for key, value in kwargs.items():
+        if self._user_index():
+            # the unique index makes the insert itself the existence check
+            try:
+                _db[self.users_collection].insert_one(self._new_user(username, password, kwargs))
+            except (DuplicateKeyError, MontyDuplicateKeyError):
+                return False
+            return True
+        with _create_user_lock:
+            user = self.get_user(username=username)
+            if user:
+                # user exists, return failure
+                return False
+            _db[self.users_collection].insert_one(self._new_user(username, password, kwargs))
+        return True
+
+    def _new_user(self, username, password, fields):
+        """_new_user(username, password, fields) - build a user record from scratch"""
+        user = {'username':username, 'password': self._hasher.hash(password)}
+        for key, value in fields.items():
             user[key] = value
-    
-        _db[self.users_collection].insert_one(user)
+        return user
+
+    def _user_index(self):
+        """
+        _user_index() - True if usernames are unique by index.  The index is made by the first
+        get_user(), create_user() or import_users(), so logins are indexed lookups from the start
+        """
+        if self._unique_usernames is None:
+            self._unique_usernames = self._ensure_user_index()
+        return self._unique_usernames
+
+    def _ensure_user_index(self):
+        """
+        _ensure_user_index() - create the unique username index of the users collection
+        : return : True if usernames are unique by index, False where the database has no
+            indexes (MontyDB) or existing duplicate usernames prevent building it, None if the
+            database could not be reached (tried again on the next use, see _user_index)
+        """
+        users = _db[self.users_collection]
+        if not _supports_indexes(users):
+            return False
+        try:
+            users.create_index('username', unique=True)
+        except (DuplicateKeyError, OperationFailure):
+            return False
+        except PyMongoError:
+            return None
         return True
     
     def update_user(self, username, **kwargs):
@@ -473,27 +1238,29 @@ class Admin:
         update_user(username, **kwargs) - update a user record with keyword arguments
         : param {username} : an existing username in the database
         : param **kwargs : Python style keyword arguments.
-        : return : True if existing username modified, False if no username exists.
-        update a user with keyword arguments
-        return True for success, False if fails
+        : return : UserUpdate {'matched': n, 'modified': n}, which is false if no username exists,
+            so "if admin.update_user(...)" still tests for the user like the old True/False result.
+        update a user with keyword arguments in one atomic update_one()
         if a keyword argument is EXPLICITLY set to None,
         the argument will be deleted from the record.
         NOTE THAT TinyMongo doesn't implement $unset
         """
-        user = self.get_user(username)
-        if user:
-            idx = {'_id': user['_id']}
-            for key, value in kwargs.items():
-                if value is None and key in user:
-                    # delete the key
-                    _db[self.users_collection].update_one(idx, {'$unset': {key:""}} )
-                else:
-                   # user[key] = value
-                    if key=='password':
-                        value = encrypt_password(value)
-                    _db[self.users_collection].update_one(idx, {'$set': {key:value}} )
-            return True
-        return False
+        if _db is None:
+            raise ValueError("Database not initialized!")
+        users = _db[self.users_collection]
+        update = {}
+        for key, value in kwargs.items():
+            if value is None:
+                update.setdefault('$unset', {})[key] = ""
+            else:
+                if key == 'password':
+                    value = self._hasher.hash(value)
+                update.setdefault('$set', {})[key] = value
+        if not update:
+            matched = 1 if users.find_one({'username': username}, {'_id': 1}) else 0
+            return UserUpdate(matched=matched, modified=0)
+        result = users.update_one({'username': username}, update)
+        return UserUpdate(matched=result.matched_count, modified=result.modified_count)
     
     def delete_user(self, username=None, uid=None):
         """delete_user(username, uid) deletes a user record by username or uid
@@ -517,12 +1284,98 @@ class Admin:
         : param {password} : string password in plain-text
         : return : Boolean True if match, False if no match
         """
+        user, reason = self.verify_user(username, password)
+        return user is not None
+
+    def verify_user(self, username, password):
+        """
+        verify_user(username, password) ==> look up the user once and check the password
+        : param {username} : string username
+        : param {password} : string password in plain-text
+        : return : (user record, None) if match, (None, reason) if no match,
+            reason is one of 'missing credentials', 'no such user', 'bad password'
+        a hash made with out of date parameters (e.g. fewer rounds) is upgraded on success.
+        raises PasswordQueueFull if the hashing pool is saturated.
+        """
+        if not username or not password:
+            return None, 'missing credentials'
         user = self.get_user(username)
-        if user:
-            if check_encrypted_password(password, user['password']):
-                return True
-        return False
+        if user is None:
+            return None, 'no such user'
+        if not user.get('password'):
+            return None, 'bad password'
+        verified, new_hash = self._hasher.verify(password, user['password'])
+        if not verified:
+            return None, 'bad password'
+        if new_hash:
+            _db[self.users_collection].update_one({'_id': user['_id']}, {'$set': {'password': new_hash}})
+            user['password'] = new_hash
+        return user, None
     
+    def import_users(self, fp, fmt, batch_size=None, processes=None, progress=None):
+        """
+        import_users(fp, fmt, batch_size=None, processes=None, progress=None) - bulk create users
+        : param {fp} : text file object of user records, each with 'username' and plain-text 'password',
+            other fields are stored as given (see create_user)
+        : param {fmt} : 'ndjson', 'csv' or 'json' (a JSON array of records)
+        : param {batch_size} : users per batch, default import_batch_size
+        : param {processes} : worker processes hashing passwords, default one per CPU
+        : param {progress} : optional callable progress(report), called after each batch
+        : return : report dict {'rows', 'inserted', 'existing', 'failed', 'errors': [{'row', 'message'}, ...]}
+        Per batch, existing usernames are found with one $in query and skipped, the passwords
+        are hashed in parallel across the process pool and the users written with one insert_many().
+        """
+        if fmt not in _IMPORT_FORMATS:
+            raise ValueError("Admin.import_users() - unknown format " + str(fmt))
+        if _db is None:
+            raise ValueError("Database not initialized!")
+        self._user_index()
+        batch_size = batch_size or self.import_batch_size
+        users = _db[self.users_collection]
+        report = {'rows': 0, 'inserted': 0, 'existing': 0, 'failed': 0, 'errors': []}
+        rows = {'ndjson': _ndjson_rows, 'csv': _csv_rows, 'json': _json_array_rows}[fmt](fp)
+        seen = set()
+
+        def flush(batch):
+            names = [user['username'] for row, user in batch]
+            existing = set(doc['username'] for doc in users.find({'username': {'$in': names}}, {'username': 1}))
+            batch = [(row, user) for row, user in batch if user['username'] not in existing]
+            report['existing'] += len(existing)
+            passwords = [user['password'] for row, user in batch]
+            chunksize = max(1, len(passwords) // ((processes or os.cpu_count() or 1) * 4))
+            for (row, user), hashed in zip(batch, pool.map(encrypt_password, passwords, chunksize=chunksize)):
+                user['password'] = hashed
+            _insert_batch(users, batch, report)
+            if progress:
+                progress(report)
+
+        batch = []
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            try:
+                for row, user in rows:
+                    report['rows'] = row
+                    if isinstance(user, Exception):
+                        _import_error(report, row, str(user))
+                        continue
+                    if not isinstance(user, dict) or not user.get('username') or not user.get('password'):
+                        _import_error(report, row, "a user needs a username and a password")
+                        continue
+                    user['username'] = str(user['username'])
+                    user['password'] = str(user['password'])
+                    if user['username'] in seen:
+                        _import_error(report, row, "duplicate username " + user['username'])
+                        continue
+                    seen.add(user['username'])
+                    batch.append((row, user))
+                    if len(batch) >= batch_size:
+                        flush(batch)
+                        batch = []
+            except (ValueError, csv.Error) as e:
+                _import_error(report, report['rows'] + 1, str(e))
+            if batch:
+                flush(batch)
+        return report
+
     def render_login(self, login_filename=None):
         """render_login(login_filename=None) returns a login page as a string contained
         login_file if None, then if loads module level file login.html
@@ -566,6 +1419,82 @@ class Admin:
             else:
                 errors.append("No such user.")
     
+        if '--import' in args:
+            idx = args.index('--import')
+            try:
+                coll, filename = args[idx+1], args[idx+2]
+            except IndexError:
+                errors.append("--import needs a collection and a file.")
+            else:
+                fmt = os.path.splitext(filename)[1].lstrip('.').lower()
+                if '--format' in args:
+                    fmt = args[args.index('--format')+1]
+                batch_size = None
+                if '--batch' in args:
+                    batch_size = int(args[args.index('--batch')+1])
+
+                def progress(report):
+                    print("... %d rows read, %d inserted, %d failed" % (report['rows'], report['inserted'], report['failed']))
+
+                with open(filename, encoding='utf-8', newline='') as fp:
+                    report = self.import_documents(coll, fp, fmt, batch_size=batch_size, progress=progress)
+                for err in report['errors']:
+                    print("row %d: %s" % (err['row'], err['message']))
+                print("*Imported %d of %d rows*" % (report['inserted'], report['rows']))
+                return True
+
+        if '--importusers' in args:
+            idx = args.index('--importusers')
+            try:
+                filename = args[idx+1]
+            except IndexError:
+                errors.append("--importusers needs a file.")
+            else:
+                fmt = os.path.splitext(filename)[1].lstrip('.').lower()
+                if '--format' in args:
+                    fmt = args[args.index('--format')+1]
+                batch_size = None
+                if '--batch' in args:
+                    batch_size = int(args[args.index('--batch')+1])
+
+                def progress(report):
+                    print("... %d rows read, %d created, %d existing" % (report['rows'], report['inserted'], report['existing']))
+
+                with open(filename, encoding='utf-8', newline='') as fp:
+                    report = self.import_users(fp, fmt, batch_size=batch_size, progress=progress)
+                for err in report['errors']:
+                    print("row %d: %s" % (err['row'], err['message']))
+                print("*Created %d users, %d already existed*" % (report['inserted'], report['existing']))
+                return True
+
+        if '--migrate' in args:
+            idx = args.index('--migrate')
+            try:
+                target = args[idx+1]
+                storage = args[args.index('--storage')+1]
+            except (IndexError, ValueError):
+                errors.append("--migrate needs a target and --storage {flatfile|sqlite|lightning}.")
+            else:
+                options = {}
+                for i, arg in enumerate(args):
+                    if arg == '--storage-option' and i + 1 < len(args):
+                        key, _, value = args[i+1].partition('=')
+                        try:
+                            # numbers and true/false, anything else stays a string
+                            options[key] = json.loads(value.lower() if value.lower() in ('true', 'false') else value)
+                        except ValueError:
+                            options[key] = value
+                batch_size = 1000
+                if '--batch' in args:
+                    batch_size = int(args[args.index('--batch')+1])
+
+                def progress(database, coll, count):
+                    print("... %s.%s %d documents" % (database, coll, count))
+
+                copied = migrate_storage(self.app.db_file, target, storage, batch_size=batch_size, progress=progress, **options)
+                print("*Copied %d documents to %s (%s)*" % (copied, target, storage))
+                return True
+
         if '--listusers' in args:
             users = self.get_users()
             for user in users:
@@ -577,8 +1506,7 @@ class Admin:
             realname = input('Real Name: ')
             email = input('Email: ')
             password = input('Password (required):')
-            if self.get_user(username=username):
-                self.update_user(username, password=password, realname=realname, email=email)
+            if self.update_user(username, password=password, realname=realname, email=email):
                 print("*Updated user*")
                 return True
             else:
@@ -626,74 +1554,1521 @@ class Admin:
     
     Other operations:
         python app.py [--createuser | --deleteuser | --listuser | --updateuser ]
+        python app.py --import {collection} {file.ndjson|file.csv|file.json} [--format {ndjson}] [--batch {1000}]
+        python app.py --importusers {file.ndjson|file.csv|file.json} [--format {ndjson}] [--batch {1000}]
+        python app.py --migrate {new.db} --storage {flatfile|sqlite|lightning} [--storage-option {journal_mode=WAL}] [--batch {1000}]
     
         createuser - creates a new user
         deleteuser - deletes an existing user
         listusers - list all users
         updateuser - update an existing user
+        import - bulk load documents into a collection
+        importusers - bulk create users from records with username and password
+        migrate - copy the MontyDB db_file into a new one using another storage engine
     """            
         print(usage)
         return False    
     
 
-def _merge_dicts(dict1, dict2):
-    """ 
-    _merge_dicts(dict1, dict2) - merge two dictionaries, return the union.
-    Using yield increases efficiency.
-    From
+def get_client(db_uri=None, db_file='minimus.db', storage=None, **options):
     """
-    for k in set(dict1.keys()).union(dict2.keys()):
-        if k in dict1 and k in dict2:
-            if isinstance(dict1[k], dict) and isinstance(dict2[k], dict):
-                # unfortunately, a recursive call
-                yield (k, dict(_merge_dicts(dict1[k], dict2[k])))
+    get_client(db_uri=None, db_file='minimus.db', storage=None, **options) - return the process-wide client
+        for db_uri (a MongoClient made with options) or else for the MontyDB db_file
+        every call with the same arguments returns the same client, so its connection pool is shared
+    : param {storage} : MontyDB engine of a new db_file, 'flatfile', 'sqlite' or 'lightning',
+        an existing db_file keeps its engine (a different one raises ValueError, see migrate_storage())
+    : param **options : MongoClient options, or the MontyDB engine settings
+        flatfile: cache_modified (writes kept in memory before the collection file is rewritten)
+        sqlite: journal_mode ('WAL', 'DELETE', ...), check_same_thread
+        lightning: map_size (bytes)
+    example
+    app.client = get_client('mongodb://localhost:27017', maxPoolSize=50, compressors='zlib')
+    app.client = get_client(db_file='minimus.db', storage='sqlite', journal_mode='WAL')
+    """
+    key = (db_uri, repr(sorted(options.items()))) if db_uri else (None, os.path.abspath(db_file))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            if db_uri:
+                listener = _PoolWaitListener()
+                client = MongoClient(db_uri, event_listeners=[listener], **options)
+                client._minimus_pool_listener = listener
             else:
-                # If one of the values is not a dict, you can't continue merging it.
-                # Value from second dict overrides one in first and we move on.
-                yield (k, dict2[k])
-                # Alternatively, replace this with exception raiser to alert you of value conflicts
-        elif k in dict1:
-            yield (k, dict1[k])
-        else:
-            yield (k, dict2[k])
-    
-def expand_fields(fields):
+                current = _monty_storage(db_file)
+                if storage and current and storage != current:
+                    raise ValueError("get_client() - %s uses the %s engine, not %s; migrate it with migrate_storage()"
+                                     % (db_file, current, storage))
+                set_storage(db_file, storage or current or 'flatfile', **options)
+                client = MontyClient(db_file)
+            client._minimus_backend = db_uri or os.path.abspath(db_file)
+            _clients[key] = client
+    return client
+
+def _monty_storage(db_file):
+    """_monty_storage(db_file) - name of the engine of an existing MontyDB repository or None"""
+    try:
+        with open(os.path.join(db_file, '.monty.storage')) as fp:
+            return fp.readline().strip() or None
+    except OSError:
+        return None
+
+def migrate_storage(source, target, storage, batch_size=1000, progress=None, **options):
     """
-    expand_fields(fields) - expand flattened fields to nested fields
-    : params data - a flattened record
-    returns expanded fields
+    migrate_storage(source, target, storage, batch_size=1000, progress=None, **options) - copy
+        every database and collection of the MontyDB repository source into a new repository
+        target that uses the engine storage (with the engine settings options, see get_client())
+    : param {progress} : optional callable progress(database, collection, count) after each collection
+    : return : number of documents copied
+    the copy is made side by side, swap the directories once it is done.
     """
-    data = {}
-    for name, value in fields.items():
-        data = dict( _merge_dicts(data, _nest_value(name, value)) )
-    return data
+    if _monty_storage(target):
+        raise ValueError("migrate_storage() - %s already holds a database" % target)
+    source_client = get_client(db_file=source)
+    target_client = get_client(db_file=target, storage=storage, **options)
+    copied = 0
+    for name in source_client.list_database_names():
+        for coll in source_client[name].list_collection_names():
+            count = 0
+            for batch in _batches(source_client[name][coll].find(), batch_size):
+                target_client[name][coll].insert_many(batch)
+                count += len(batch)
+            copied += count
+            if progress:
+                progress(name, coll, count)
+    return copied
 
-def _nest_value(name, value):
+class RoutedDatabase:
     """
-    _nest_value(name, value) - put the fields from a 
-    "flattened" dotted name into nested structure and return
-    
-    :param name - the flattened dotted name
-    :param value - the actual value
-    
-    return nested_value
-    
-    How can I do this cleaner with a dict structure?
+    RoutedDatabase(default, routes) - a database that keeps each collection on one of several
+    backends, e.g. busy collections on MongoDB and _meta and the users in a local MontyDB file.
+    It offers the database methods Admin uses, so every view works wherever a collection lives.
+    : param {default} : database of the collections no route matches
+    : param {routes} : list of (pattern, database), pattern is a collection name or fnmatch pattern
     """
-    data = {}
-    parts = name.strip().split('.')
-    if len(parts) == 1:
-        data.update({parts[0]:value})
-    elif len(parts) == 2:
-        data.update({parts[0]: {parts[1]:value}})
-    elif len(parts) == 3:
-        data.update( {parts[0]: { parts[1] : { parts[2] : value } } } )
-    else:
-        raise ValueError("Schmema depth exceeds maximum limit of 3")
-    return data
-    
+    def __init__(self, default, routes):
+        self.default = default
+        self.routes = list(routes)
+        self.name = default.name
 
-def _get_nested_value(name, data):
+    def database_for(self, coll):
+        """database_for(coll) - the database that holds coll"""
+        for pattern, database in self.routes:
+            if pattern == coll or fnmatch.fnmatchcase(coll, pattern):
+                return database
+        return self.default
+
+    def __getitem__(self, coll):
+        return self.database_for(coll)[coll]
+
+    def __getattr__(self, name):
+        """
+        db.coll is the collection coll on its backend, as db['coll']; the other attributes
+        of the Database API (client, codec_options, ...) are those of the default database
+        """
+        if name.startswith('_') or hasattr(type(self.default), name):
+            return getattr(self.default, name)
+        return self[name]
+
+    def get_collection(self, coll, **kwargs):
+        return self.database_for(coll).get_collection(coll, **kwargs)
+
+    def list_collection_names(self):
+        """list_collection_names() - the collections of every backend that are routed to it"""
+        names = []
+        seen = set()
+        for database in [self.default] + [database for pattern, database in self.routes]:
+            if id(database) in seen:
+                continue
+            seen.add(id(database))
+            names.extend(coll for coll in database.list_collection_names() if self.database_for(coll) is database)
+        return names
+
+    def drop_collection(self, coll):
+        return self.database_for(coll).drop_collection(coll)
+
+    def command(self, command, value=1, **kwargs):
+        """command(command, value) - run a command on the backend of collection value (e.g. collStats)"""
+        database = self.database_for(value) if isinstance(value, str) else self.default
+        return database.command(command, value, **kwargs)
+
+
+def _pool_listener(client):
+    """_pool_listener(client) - the _PoolWaitListener of a client made by get_client() or None"""
+    return getattr(client, '_minimus_pool_listener', None)
+
+
+class _PoolWaitListener(ConnectionPoolListener):
+    """
+    _PoolWaitListener() - pymongo pool listener counting checkouts and keeping the wait
+    time of the most recent ones (a fixed size deque, so memory does not grow)
+    """
+    def __init__(self, keep=1000):
+        self.waits = deque(maxlen=keep)
+        self.checkouts = 0
+        self.failed = 0
+        self.in_use = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def connection_checked_out(self, event):
+        wait = event.duration or 0.0
+        self.checkouts += 1
+        self.in_use += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.waits.append(wait)
+
+    def connection_check_out_failed(self, event):
+        self.failed += 1
+
+    def connection_checked_in(self, event):
+        self.in_use -= 1
+
+    def stats(self):
+        """stats() - see Admin.pool_stats()"""
+        waits = sorted(self.waits)
+        percentile = lambda q: waits[min(len(waits) - 1, int(q * len(waits)))] * 1000 if waits else 0.0
+        return {'checkouts': self.checkouts, 'failed': self.failed, 'in_use': self.in_use,
+                'wait_ms': {'mean': self.total_wait * 1000 / self.checkouts if self.checkouts else 0.0,
+                            'p50': percentile(0.50), 'p95': percentile(0.95), 'p99': percentile(0.99),
+                            'max': self.max_wait * 1000}}
+
+    # the remaining pool events are not needed
+    def connection_check_out_started(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+
+
+class AsyncAdmin(Admin):
+    """
+    AsyncAdmin(app, db_workers=8, **options) - an Admin whose route handlers are coroutines,
+    for hosts that serve requests from an asyncio event loop. Routes, templates and options
+    are those of Admin, the sync handlers stay registered with the Minimus app.
+    await admin.dispatch(route_name, env, **kwargs) runs a handler.
+    When db_uri is given (without collection_routes), logins, view_all and the pages of
+    view_collection read MongoDB through pymongo's AsyncMongoClient and logins wait for the
+    password pool without holding a thread.  Every other handler, streamed and explained pages
+    and all of MontyDB (which has no async driver) run on a bounded pool of db_workers threads.
+    """
+    def __init__(self, app, db_workers=8, **kwargs):
+        self.db_executor = ThreadPoolExecutor(max_workers=db_workers, thread_name_prefix='minimus-admin-db')
+        super().__init__(app, **kwargs)
+        self.async_db = None
+        if (kwargs.get('db_uri') and not kwargs.get('collection_routes') and AsyncMongoClient is not None
+                and not _is_monty(_db[self.users_collection])):
+            self.async_db = AsyncMongoClient(kwargs['db_uri'], **(kwargs.get('client_options') or {}))[kwargs.get('admin_database', 'minimus_admin')]
+        self.async_handlers = {name: self._in_executor(handler) for name, handler in self.handlers.items()}
+        self.async_handlers['admin_login'] = self.login_async
+        if self.async_db is not None:
+            self.async_handlers['admin_view_all'] = self.view_all_async
+            self.async_handlers['admin_view_collection'] = self.view_collection_async
+
+    def _in_executor(self, f):
+        """_in_executor(f) - return a coroutine function running f on the db_workers pool"""
+        @wraps(f)
+        async def coroutine(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.db_executor, functools.partial(f, *args, **kwargs))
+        return coroutine
+
+    async def dispatch(self, route_name, env, **kwargs):
+        """
+        dispatch(route_name, env, **kwargs) - await the handler of an admin route
+        : param {route_name} : the route_name it was registered with, e.g. 'admin_view_all'
+        : return : whatever the sync handler returns (HTML string, redirect, ...)
+        """
+        return await self.async_handlers[route_name](env, **kwargs)
+
+    async def get_user_async(self, username):
+        """get_user_async(username) - coroutine version of get_user(username)"""
+        if self.async_db is not None:
+            if self._unique_usernames is None:
+                await self._in_executor(self._user_index)()
+            return await self.async_db[self.users_collection].find_one({'username': username})
+        return await self._in_executor(self.get_user)(username)
+
+    async def verify_user_async(self, username, password):
+        """verify_user_async(username, password) - coroutine version of verify_user()"""
+        if not username or not password:
+            return None, 'missing credentials'
+        user = await self.get_user_async(username)
+        if user is None:
+            return None, 'no such user'
+        if not user.get('password'):
+            return None, 'bad password'
+        verified, new_hash = await asyncio.wrap_future(self._hasher.submit(_verify_and_update, password, user['password']))
+        if not verified:
+            return None, 'bad password'
+        if new_hash:
+            update = ({'_id': user['_id']}, {'$set': {'password': new_hash}})
+            if self.async_db is not None:
+                await self.async_db[self.users_collection].update_one(*update)
+            else:
+                await self._in_executor(_db[self.users_collection].update_one)(*update)
+            user['password'] = new_hash
+        return user, None
+
+    async def login_async(self, env, filename=None, next=None):
+        """login_async(env, filename=None, next=None) - coroutine version of login()"""
+        env[_ROUTE] = 'admin_login'
+        if env.get('REQUEST_METHOD') != 'POST':
+            return await self._in_executor(self.login)(env, filename, next)
+        fields = await self._in_executor(parse_formvars)(env)
+        username = fields.get('username')
+        password = fields.get('password')
+        if not self.login_allowed(env.get('REMOTE_ADDR'), username):
+            return abort(429)
+        try:
+            user, reason = await self.verify_user_async(username, password)
+        except PasswordQueueFull:
+            return abort(503)
+        if user:
+            user['_id'] = str(user['_id'])
+            await self._in_executor(self.login_user)(user, env)
+            next = 'admin_view_all' if next is None else next
+            return redirect(url_for(next))
+        if filename is None:
+            return self.render_login()
+        return render_template(filename)
+
+    async def view_all_async(self, env):
+        """view_all_async(env) - coroutine version of view_all(), the statistics are read concurrently"""
+        env[_ROUTE] = 'admin_view_all'
+        if not await self._in_executor(self.login_check)(env):
+            return redirect(url_for('admin_login'))
+        collections = await self.async_db.list_collection_names()
+        names = [coll for coll in collections if coll != '_meta']
+        stats = await asyncio.gather(*(self.collection_stats_async(coll) for coll in names))
+        return render_template('admin/view_all.html', collections=collections, stats=dict(zip(names, stats)))
+
+    async def collection_stats_async(self, coll):
+        """collection_stats_async(coll) - coroutine version of collection_stats(), sharing its cache"""
+        key = self._cache_key(coll)
+        cached = _stats_cache.get(key)
+        if cached is None or cached[0] < time.monotonic():
+            stats = await _collection_stats_async(self.async_db, coll)
+            cached = (time.monotonic() + self.stats_ttl, stats)
+            _stats_cache[key] = cached
+        return cached[1]
+
+    async def get_schema_async(self, coll):
+        """get_schema_async(coll) - coroutine version of get_schema(), sharing its cache"""
+        key = self._schema_key(coll)
+        cached = _schema_cache.get(key)
+        if cached is None or cached[0] < time.monotonic():
+            rec = await self.async_db['_meta'].find_one({'name': coll})
+            cached = (time.monotonic() + self.schema_ttl, _compile_schema(rec) if rec else None)
+            _schema_cache[key] = cached
+        return cached[1]
+
+    async def view_collection_async(self, env, coll):
+        """
+        view_collection_async(env, coll) - coroutine version of view_collection(), the page is read
+        with AsyncMongoClient.  Streamed (see wsgi_middleware) and explained pages use the thread pool.
+        """
+        params = _query_params(env)
+        if params.get('explain') or env.get(_STREAMING):
+            return await self._in_executor(self.handlers['admin_view_collection'])(env, coll=coll)
+        env[_ROUTE] = 'admin_view_collection'
+        if not await self._in_executor(self.login_check)(env):
+            return redirect(url_for('admin_login'))
+        size = _page_size(params.get('size'), self.page_size)
+        schema = await self.get_schema_async(coll)
+        try:
+            data, has_prev, has_next = await _keyset_page_async(
+                self.async_db[coll], after=params.get('after'), before=params.get('before'), size=size,
+                query=self.collection_query(coll, params, size), projection=schema['projection'] if schema else None,
+                sort=_query_sort(params))
+        except Exception as e:
+            return jsonify({'status': 'error', 'message': 'Admin view_collection(), ' + str(e)})
+        base_url, link_params = _view_links(coll, params)
+        page = _page_links(base_url, data, has_prev, has_next, link_params)
+        for doc in data:
+            doc['_id'] = str(doc['_id'])
+        return self._render_collection(render_template, coll, schema, data, page, False, params)
+
+
+def _query_params(env):
+    """
+    _query_params(env) - parse the request query string
+    :param env - the WSGI environment
+    return dict of parameter name to (first) value
+    """
+    params = parse_qs(env.get('QUERY_STRING', ''))
+    return {k: v[0] for k, v in params.items()}
+
+def _page_size(value, default, maximum=1000):
+    """
+    _page_size(value, default, maximum=1000) - sanitize a requested page size
+    return an integer between 1 and maximum, default if value is missing or invalid
+    """
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+def _query_filter(params):
+    """
+    _query_filter(params) - build a filter document from q.<field>=<value> query parameters.
+    Dotted field names reach into nested documents.  A value that looks like a number also
+    matches the number, since form values always arrive as strings.
+    :param params - the query parameters (see _query_params)
+    return filter dict
+    """
+    query = {}
+    for key, value in params.items():
+        if not key.startswith('q.') or not value:
+            continue
+        field = key[2:].strip()
+        if not field or field.startswith('$'):
+            continue
+        number = _to_number(value)
+        query[field] = value if number is None else {'$in': [value, number]}
+    return query
+
+def _query_sort(params):
+    """
+    _query_sort(params) - read sort=<field>&dir=<asc|desc> query parameters
+    return (field, 1 or -1) or None if no sort was requested
+    """
+    field = params.get('sort', '').strip()
+    if not field or field.startswith('$'):
+        return None
+    return field, -1 if params.get('dir') == 'desc' else 1
+
+def _words(value):
+    """
+    _words(value) - lower case words of a string, or of all strings in a document
+    (nested dicts and lists included, the _id excluded)
+    return list of words
+    """
+    if isinstance(value, str):
+        return re.findall(r'\w+', value.lower())
+    words = []
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key != '_id':
+                words.extend(_words(item))
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            words.extend(_words(item))
+    return words
+
+def _to_number(value):
+    """_to_number(value) - convert a string to an int or float, None if it is not a number"""
+    for kind in (int, float):
+        try:
+            return kind(value)
+        except ValueError:
+            pass
+    return None
+
+def _is_monty(db_object):
+    """_is_monty(db_object) - True if the database or collection is served by MontyDB"""
+    # look through the wrappers of Admin(profile=True)
+    if isinstance(db_object, (_ProfiledDatabase, _ProfiledCollection)):
+        db_object = db_object.wrapped
+    return type(db_object).__module__.startswith('montydb')
+
+def _supports_indexes(db_object):
+    """
+    _supports_indexes(db_object) - True if the database or collection maintains indexes.
+    MontyDB accepts create_index() but does not build anything.
+    """
+    return not _is_monty(db_object)
+
+def _sort_index_keys(name):
+    """_sort_index_keys(name) - index keys that serve filters on name and (name, _id) keyset pages"""
+    return [(name, 1), ('_id', 1)]
+
+def _index_sizes(db, coll):
+    """
+    _index_sizes(db, coll) - size in bytes of each index of a collection as reported by MongoDB
+    return dict of index name to size, empty when the backend does not report it
+    """
+    if not _supports_indexes(db[coll]):
+        return {}
+    try:
+        return dict(db.command('collStats', coll).get('indexSizes', {}))
+    except Exception:
+        return {}
+
+def _collection_stats(db, coll):
+    """
+    _collection_stats(db, coll) - gather the statistics of a collection shown in view_all
+    return dict with
+        'count' - number of documents (estimated on MongoDB)
+        'size', 'storage_size', 'index_size' - bytes, None when the backend does not report them
+        'last_added' - creation time of the newest ObjectId, None if unknown
+    """
+    collection = db[coll]
+    stats = {'count': None, 'size': None, 'storage_size': None, 'index_size': None, 'last_added': None}
+    try:
+        if _is_monty(collection):
+            # MontyDB keeps no counters, this reads the collection
+            stats['count'] = collection.count_documents({})
+        else:
+            stats['count'] = collection.estimated_document_count()
+            info = db.command('collStats', coll)
+            stats['size'] = info.get('size')
+            stats['storage_size'] = info.get('storageSize')
+            stats['index_size'] = info.get('totalIndexSize')
+    except Exception:
+        pass
+    # ObjectIds start with their creation time, so the largest one is the newest insert
+    newest = collection.find_one({}, {'_id': 1}, sort=[('_id', -1)])
+    if newest is not None:
+        stats['last_added'] = getattr(newest['_id'], 'generation_time', None)
+    return stats
+
+async def _collection_stats_async(db, coll):
+    """_collection_stats_async(db, coll) - coroutine version of _collection_stats() for a pymongo AsyncDatabase"""
+    collection = db[coll]
+    stats = {'count': None, 'size': None, 'storage_size': None, 'index_size': None, 'last_added': None}
+    try:
+        stats['count'] = await collection.estimated_document_count()
+        info = await db.command('collStats', coll)
+        stats['size'] = info.get('size')
+        stats['storage_size'] = info.get('storageSize')
+        stats['index_size'] = info.get('totalIndexSize')
+    except Exception:
+        pass
+    newest = await collection.find_one({}, {'_id': 1}, sort=[('_id', -1)])
+    if newest is not None:
+        stats['last_added'] = getattr(newest['_id'], 'generation_time', None)
+    return stats
+
+def _object_id(id, db_object=None):
+    """
+    _object_id(id, db_object=None) - convert a string id to the ObjectId type of the backend of
+    db_object (a database or collection). MontyDB stores its own ObjectId unless it was set up
+    with use_bson, and it cannot compare that type with bson's. raises on an invalid id
+    """
+    if db_object is not None and _is_monty(db_object):
+        return monty_bson.ObjectId(id)
+    return ObjectId(id)
+
+def _to_object_id(id, db_object=None):
+    """
+    _to_object_id(id, db_object=None) - convert a string id to an ObjectId when possible, see _object_id
+    documents inserted with non-ObjectId keys keep their raw id
+    """
+    try:
+        return _object_id(id, db_object)
+    except (InvalidId, monty_bson.InvalidId, TypeError):
+        return id
+
+def _anchor(id):
+    """
+    _anchor(id) - the after/before value of a page link for a document _id: the hex string
+    of an ObjectId, any other _id as JSON so it keeps its type (see _anchor_id)
+    """
+    if isinstance(id, (ObjectId, monty_bson.ObjectId)):
+        return str(id)
+    return json.dumps(id, default=str)
+
+def _anchor_id(anchor, db_object=None):
+    """
+    _anchor_id(anchor, db_object=None) - the _id of an after/before value made by _anchor(),
+    a value that is neither an ObjectId nor JSON is taken as a string _id
+    """
+    try:
+        return _object_id(anchor, db_object)
+    except (InvalidId, monty_bson.InvalidId, TypeError):
+        pass
+    try:
+        return json.loads(anchor)
+    except ValueError:
+        return anchor
+
+def _keyset_query(collection, after=None, before=None, query=None, sort=None):
+    """
+    _keyset_query(collection, after, before, query, sort) - combine a filter with the range of a page.
+    Pages are ordered on (sort field, _id); the sort value of the after/before document is looked
+    up by its _id, so the links only have to carry the _id (see _anchor).
+
+    :param sort - (field, direction) tuple, None to order by _id
+    return (query, sort specification)
+    """
+    field = (sort or ('_id', 1))[0]
+    anchor = before or after
+    doc = None
+    if anchor and field != '_id':
+        doc = collection.find_one({'_id': _anchor_id(anchor, collection)}, {field: 1})
+    return _keyset_range(collection, after, before, query, sort, doc)
+
+async def _keyset_query_async(collection, after=None, before=None, query=None, sort=None):
+    """_keyset_query_async(collection, ...) - coroutine version of _keyset_query() for a pymongo AsyncCollection"""
+    field = (sort or ('_id', 1))[0]
+    anchor = before or after
+    doc = None
+    if anchor and field != '_id':
+        doc = await collection.find_one({'_id': _anchor_id(anchor, collection)}, {field: 1})
+    return _keyset_range(collection, after, before, query, sort, doc)
+
+def _keyset_range(collection, after, before, query, sort, anchor_doc):
+    """
+    _keyset_range(collection, after, before, query, sort, anchor_doc) - the part of _keyset_query()
+    after the anchor lookup, anchor_doc holds the sort field of the after/before document
+    return (query, sort specification)
+    """
+    field, direction = sort or ('_id', 1)
+    if before:
+        # walk backward, the page is reversed by the caller
+        direction = -direction
+    op = '$gt' if direction == 1 else '$lt'
+    anchor = before or after
+    keyset = {}
+    if anchor and field == '_id':
+        keyset = {'_id': {op: _anchor_id(anchor, collection)}}
+    elif anchor and anchor_doc is not None:
+        # an anchor that was deleted meanwhile restarts at the first page
+        keyset = _keyset_condition(field, _get_dotted_value(field, anchor_doc), _anchor_id(anchor, collection), op)
+
+    spec = [(field, direction)]
+    if field != '_id':
+        spec.append(('_id', direction))
+    if query and keyset:
+        return {'$and': [query, keyset]}, spec
+    return query or keyset, spec
+
+def _keyset_condition(field, value, anchor_id, op):
+    """
+    _keyset_condition(field, value, anchor_id, op) - filter for the documents beyond
+    (value, anchor_id) when walking a (field, _id) ordering with op ('$gt' or '$lt').
+    null and missing values sort before any other value.  Fields holding mixed types
+    do not page reliably, since comparisons only match values of the same type.
+    """
+    tie = {field: value, '_id': {op: anchor_id}}
+    if value is None:
+        if op == '$gt':
+            return {'$or': [{field: {'$ne': None}}, tie]}
+        return tie
+    beyond = {field: {op: value}}
+    if op == '$lt':
+        return {'$or': [beyond, {field: None}, tie]}
+    return {'$or': [beyond, tie]}
+
+def _keyset_page(collection, after=None, before=None, size=50, query=None, projection=None, sort=None):
+    """
+    _keyset_page(collection, after, before, size, query, projection, sort) - fetch one page of
+    documents ordered by _id (or by sort, then _id).  Instead of skipping over documents, the page
+    starts just after (or just before) a known _id, so each page is a bounded range scan of an index.
+
+    :param collection - the collection to read
+    :param after - string _id, return the documents following it
+    :param before - string _id, return the documents preceding it
+    :param size - maximum number of documents in the page
+    :param query - an optional filter document
+    :param projection - an optional projection, only these fields are returned
+    :param sort - an optional (field, direction) tuple
+    return (docs, has_prev, has_next)
+    """
+    query, spec = _keyset_query(collection, after, before, query, sort)
+
+    # fetch one extra document to find out if there is more in this direction
+    docs = list(collection.find(query, projection).sort(spec).limit(size + 1))
+    return _keyset_result(docs, after, before, size)
+
+async def _keyset_page_async(collection, after=None, before=None, size=50, query=None, projection=None, sort=None):
+    """_keyset_page_async(collection, ...) - coroutine version of _keyset_page() for a pymongo AsyncCollection"""
+    query, spec = await _keyset_query_async(collection, after, before, query, sort)
+    docs = await collection.find(query, projection).sort(spec).limit(size + 1).to_list()
+    return _keyset_result(docs, after, before, size)
+
+def _keyset_result(docs, after, before, size):
+    """
+    _keyset_result(docs, after, before, size) - the page of the size + 1 documents read by _keyset_page()
+    return (docs, has_prev, has_next)
+    """
+    more = len(docs) > size
+    docs = docs[:size]
+    if before:
+        docs.reverse()
+        return docs, more, True
+    return docs, bool(after), more
+
+def _keyset_stream(collection, page, base_url, after=None, before=None, size=50, query=None,
+                   projection=None, sort=None, params=None):
+    """
+    _keyset_stream(collection, page, base_url, ...) - generator version of _keyset_page() for
+    streamed rendering.  Documents are yielded (with a string _id) as they come off the cursor,
+    then the 'prev' and 'next' links of page are filled in (see _page_links).
+    """
+    if before:
+        # a backward page is read in reverse order, so collect it first (at most size documents)
+        docs, has_prev, has_next = _keyset_page(collection, before=before, size=size,
+                                                query=query, projection=projection, sort=sort)
+        # the links need the _id with its type
+        page.update(_page_links(base_url, docs, has_prev, has_next, params))
+        for doc in docs:
+            doc['_id'] = str(doc['_id'])
+            yield doc
+        return
+    else:
+        query, spec = _keyset_query(collection, after, None, query, sort)
+        cursor = collection.find(query, projection).sort(spec).limit(size + 1)
+        # only the first and last document are needed for the links
+        first = last = None
+        count = 0
+        for doc in cursor:
+            count += 1
+            if count > size:
+                break
+            # the links need the _id with its type
+            if first is None:
+                first = {'_id': doc['_id']}
+            last = {'_id': doc['_id']}
+            doc['_id'] = str(doc['_id'])
+            yield doc
+        docs = [first, last] if first else []
+        has_prev, has_next = bool(after), count > size
+    page.update(_page_links(base_url, docs, has_prev, has_next, params))
+
+def _explain_report(collection, query, projection, spec, limit):
+    """
+    _explain_report(collection, query, projection, spec, limit) - describe how find(query, projection)
+    .sort(spec).limit(limit) is executed
+    return dict with
+        'backend', 'filter', 'sort', 'limit' - what was explained
+        'plan' - stages of the winning plan from the top, e.g. ['LIMIT', 'FETCH', 'IXSCAN']
+        'indexes' - names of the indexes used, empty for a collection scan
+        'returned', 'keys_examined', 'docs_examined', 'time_ms' - execution statistics
+        'suggest' - fields worth an index when the plan scans the collection, see view_indexes
+        'raw' - the explain output of MongoDB as JSON, None on MontyDB
+    """
+    report = {'filter': _to_json(query), 'sort': _to_json(spec), 'limit': limit, 'raw': None}
+    if _is_monty(collection):
+        start = time.perf_counter()
+        returned = len(list(collection.find(query, projection).sort(spec).limit(limit)))
+        report['time_ms'] = (time.perf_counter() - start) * 1000
+        report.update({'backend': 'MontyDB', 'indexes': [], 'returned': returned, 'keys_examined': 0,
+                       # every document is decoded and matched, there are no indexes
+                       'docs_examined': collection.count_documents({}),
+                       'plan': ['LIMIT', 'SORT (in memory)', 'COLLSCAN']})
+    else:
+        explained = collection.find(query, projection).sort(spec).limit(limit).explain()
+        planner = explained.get('queryPlanner', {})
+        winning = planner.get('winningPlan', {})
+        # the slot based engine nests the classic plan under 'queryPlan'
+        winning = winning.get('queryPlan', winning)
+        stats = explained.get('executionStats', {})
+        stages = _plan_stages(winning)
+        report.update({'backend': 'MongoDB', 'plan': [stage.get('stage') for stage in stages],
+                       'indexes': [stage['indexName'] for stage in stages if stage.get('indexName')],
+                       'returned': stats.get('nReturned'), 'keys_examined': stats.get('totalKeysExamined'),
+                       'docs_examined': stats.get('totalDocsExamined'), 'time_ms': stats.get('executionTimeMillis'),
+                       'raw': _to_json(explained, indent=2)})
+    report['suggest'] = []
+    if 'COLLSCAN' in report['plan'] or (report['plan'] and 'SORT' in report['plan'][:2]):
+        fields = [name for name in _query_fields(query) if name != '_id']
+        fields += [name for name, direction in spec if name != '_id' and name not in fields]
+        report['suggest'] = fields
+    return report
+
+def _plan_stages(plan):
+    """_plan_stages(plan) - flatten a winning plan into its list of stages, top stage first"""
+    stages = []
+    while plan:
+        stages.append(plan)
+        inputs = plan.get('inputStages') or []
+        plan = plan.get('inputStage') or (inputs[0] if inputs else None)
+    return stages
+
+def _query_fields(query):
+    """
+    _query_fields(query) - the field names a filter tests, in order and without repeats, including
+    those inside $and, $or and $nor (keyset pages and filtered views combine their conditions with $and)
+    """
+    fields = []
+    for name, value in query.items():
+        if name in ('$and', '$or', '$nor'):
+            for clause in value:
+                fields += [field for field in _query_fields(clause) if field not in fields]
+        elif not name.startswith('$') and name not in fields:
+            fields.append(name)
+    return fields
+
+def _to_json(value, indent=None):
+    """_to_json(value, indent=None) - JSON text of a query or explain document, ObjectIds and dates as strings"""
+    return json.dumps(value, indent=indent, default=str)
+
+def _view_links(coll, params):
+    """
+    _view_links(coll, params) - the url of view_collection and the query parameters its
+    navigation links carry along (page size, sort and filter)
+    return (base_url, link_params)
+    """
+    base_url = url_for('admin_view_collection', coll=coll)
+    return base_url, {k: v for k, v in params.items() if k not in ('after', 'before')}
+
+def _page_links(base_url, docs, has_prev, has_next, params=None):
+    """
+    _page_links(base_url, docs, has_prev, has_next, params) - build first/prev/next urls
+    for a page returned by _keyset_page(), before the docs _id are made strings (see _anchor).
+    :param params - extra query parameters to carry on every link
+    return dict with 'first', 'prev' and 'next' urls (None when not available)
+    """
+    params = dict(params or {})
+
+    def link(**kwargs):
+        query = urlencode(dict(params, **kwargs))
+        return base_url + '?' + query if query else base_url
+
+    page = {'first': link(), 'prev': None, 'next': None}
+    if docs and has_prev:
+        page['prev'] = link(before=_anchor(docs[0]['_id']))
+    if docs and has_next:
+        page['next'] = link(after=_anchor(docs[-1]['_id']))
+    return page
+
+def _text_window(collection, matches, query=None, sort=None, after=None, before=None, size=50):
+    """
+    _text_window(collection, matches, query, sort, after, before, size) - the _ids of one page of
+    a MontyDB search.  matches (the set of _id found by _TextIndex) are narrowed to the documents of
+    query, ordered on (sort field, _id) and cut to the size + 1 following after (or preceding before),
+    the range _keyset_page() reads.  Filter and sort values are read with one scan and no $in.
+    return list of _id
+    """
+    field, direction = sort or ('_id', 1)
+    if query or field != '_id':
+        keys = {}
+        for doc in collection.find(query or {}, {field: 1}):
+            if doc['_id'] in matches:
+                keys[doc['_id']] = (_sort_value(_get_dotted_value(field, doc)), _sort_value(doc['_id']))
+    else:
+        keys = {id: (_sort_value(id),) for id in matches}
+    ids = sorted(keys, key=keys.get)
+    ordered = [keys[id] for id in ids]
+    # forward on an ascending sort (or backward on a descending one) walks up the ordering
+    up = (direction == 1) != bool(before)
+    anchor = before or after
+    anchor_key = None
+    if anchor:
+        anchor_id = _anchor_id(anchor, collection)
+        anchor_key = keys.get(anchor_id)
+        if anchor_key is None and field == '_id':
+            anchor_key = (_sort_value(anchor_id),)
+        elif anchor_key is None:
+            # the anchor no longer matches, its position comes from its sort value
+            doc = collection.find_one({'_id': anchor_id}, {field: 1})
+            if doc is not None:
+                anchor_key = (_sort_value(_get_dotted_value(field, doc)), _sort_value(anchor_id))
+    if anchor_key is None:
+        # no anchor, or one that was deleted meanwhile, as _keyset_query()
+        return ids[:size + 1] if up else ids[-(size + 1):]
+    if up:
+        start = bisect.bisect_right(ordered, anchor_key)
+        return ids[start:start + size + 1]
+    stop = bisect.bisect_left(ordered, anchor_key)
+    return ids[max(0, stop - size - 1):stop]
+
+def _sort_value(value):
+    """
+    _sort_value(value) - key that orders values in Python as a MongoDB sort does:
+    null, numbers, strings, documents, arrays, binary, ObjectId, booleans, dates
+    (documents and arrays are compared by their text)
+    """
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (8, value)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, dict):
+        return (3, str(value))
+    if isinstance(value, (list, tuple)):
+        return (4, str(value))
+    if isinstance(value, bytes):
+        return (5, value)
+    if isinstance(value, (ObjectId, monty_bson.ObjectId)):
+        return (7, str(value))
+    if isinstance(value, datetime.datetime):
+        return (9, value.timestamp())
+    return (10, str(value))
+
+def _ids_filter(ids):
+    """
+    _ids_filter(ids) - filter for a short list of _id.  MontyDB tests a $in against each
+    document one value at a time, the range in front of it rules most of them out first.
+    """
+    try:
+        return {'_id': {'$gte': min(ids), '$lte': max(ids), '$in': ids}}
+    except (TypeError, ValueError):
+        # no _ids, or _ids of types that do not compare
+        return {'_id': {'$in': ids}}
+
+class _TextIndex:
+    """
+    _TextIndex() - in-memory inverted index of the words in the string values of a collection.
+    A search only touches the posting sets of its words, so it costs time in proportion to
+    the matches rather than to the size of the collection.
+    """
+    def __init__(self):
+        self.postings = {}  # word => set of _id
+        self.doc_words = {}  # _id => set of words
+
+    def add(self, doc):
+        """add (or replace) a document"""
+        self.remove(doc['_id'])
+        words = set(_words(doc))
+        self.doc_words[doc['_id']] = words
+        for word in words:
+            self.postings.setdefault(word, set()).add(doc['_id'])
+
+    def remove(self, id):
+        """remove the document with this _id"""
+        for word in self.doc_words.pop(id, ()):
+            ids = self.postings[word]
+            ids.discard(id)
+            if not ids:
+                del self.postings[word]
+
+    def search(self, words):
+        """return the set of _id of documents containing every one of words"""
+        postings = sorted((self.postings.get(word, set()) for word in set(words)), key=len)
+        if not postings:
+            return set()
+        # intersect starting from the rarest word
+        result = set(postings[0])
+        for ids in postings[1:]:
+            result &= ids
+        return result
+
+
+class _PasswordHasher:
+    """
+    _PasswordHasher(workers, queue_limit) - runs pbkdf2 hashing and verification on a
+    small dedicated thread pool so a burst of logins cannot occupy every request thread.
+    : param {workers} : size of the pool
+    : param {queue_limit} : jobs allowed to be pending at once, more raise PasswordQueueFull
+    """
+    def __init__(self, workers=2, queue_limit=16):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='minimus-admin-hash')
+        self.queue_limit = queue_limit
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    def run(self, fn, *args):
+        """run fn(*args) on the pool and wait for its result"""
+        return self.submit(fn, *args).result()
+
+    def submit(self, fn, *args):
+        """submit fn(*args) to the pool, return its concurrent.futures.Future"""
+        with self.lock:
+            if self.pending >= self.queue_limit:
+                raise PasswordQueueFull("%d password jobs pending" % self.pending)
+            self.pending += 1
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self.lock:
+            self.pending -= 1
+
+    def hash(self, password):
+        """return the pbkdf2 hash of password"""
+        return self.run(encrypt_password, password)
+
+    def verify(self, password, hashed):
+        """return (verified, new hash or None), the new hash is set when hashed needs_update"""
+        return self.run(_verify_and_update, password, hashed)
+
+
+class UserUpdate(dict):
+    """
+    UserUpdate(matched=n, modified=n) - the result of Admin.update_user(), a dict that is
+    true only when the username matched a user, whether or not anything was modified.
+    """
+    def __bool__(self):
+        return self.get('matched', 0) > 0
+
+
+class _TokenBuckets:
+    """
+    _TokenBuckets(attempts, seconds) - per-key token buckets holding up to attempts tokens,
+    refilled at attempts/seconds tokens a second. a key's state is one (tokens, timestamp)
+    tuple, buckets that have refilled completely are swept since they equal a missing one.
+    : param {max_keys} : keys kept before the oldest are dropped (bounds memory under a flood)
+    """
+    def __init__(self, attempts, seconds, max_keys=100000):
+        self.capacity = float(attempts)
+        self.rate = float(attempts) / seconds
+        self.max_keys = max_keys
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.next_sweep = 0
+
+    def take(self, key, now=None):
+        """take(key) - return True and spend a token if key has one left, else False"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if now >= self.next_sweep or len(self.buckets) >= self.max_keys:
+                self._sweep(now)
+            tokens, stamp = self.buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - stamp) * self.rate)
+            allowed = tokens >= 1
+            self.buckets[key] = (tokens - 1 if allowed else tokens, now)
+            return allowed
+
+    def _sweep(self, now):
+        """drop the buckets that are full again, then the oldest ones if still over max_keys"""
+        capacity, rate = self.capacity, self.rate
+        self.buckets = {key: (tokens, stamp) for key, (tokens, stamp) in self.buckets.items()
+                        if tokens + (now - stamp) * rate < capacity}
+        if len(self.buckets) >= self.max_keys:
+            keys = list(self.buckets)[:len(self.buckets) - self.max_keys // 2]
+            for key in keys:
+                del self.buckets[key]
+        self.next_sweep = now + capacity / rate
+
+
+class StreamingResponse:
+    """
+    StreamingResponse(chunks, status, headers) - a WSGI response body that is sent
+    chunk by chunk while it is produced, see Admin.wsgi_middleware()
+    : param {chunks} : iterable of str or bytes
+    """
+    def __init__(self, chunks, status='200 OK', headers=None):
+        self.chunks = chunks
+        self.status = status
+        self.headers = headers or [('Content-Type', 'text/html; charset=utf-8')]
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                yield chunk
+
+    def close(self):
+        """release the underlying generator (and its cursor) if the client goes away"""
+        if hasattr(self.chunks, 'close'):
+            self.chunks.close()
+
+
+# per-thread profile of the admin request being served, see Admin(profile=True)
+_profiling = threading.local()
+
+# phases a profiled request is split in, the time outside them is reported as 'other'
+_PROFILE_PHASES = ('db', 'transform', 'render', 'other')
+
+def _phase(name):
+    """
+    _phase(name) - decorator booking the time of a function to phase name of the request
+    being profiled, without a profiled request the cost is one thread-local lookup
+    """
+    def decorator(f):
+        @wraps(f)
+        def timed(*args, **kwargs):
+            record = getattr(_profiling, 'record', None)
+            if record is None:
+                return f(*args, **kwargs)
+            record.enter(name)
+            try:
+                return f(*args, **kwargs)
+            finally:
+                record.exit()
+        return timed
+    return decorator
+
+# the templates the handlers render are booked to the 'render' phase
+render_template = _phase('render')(render_template)
+
+
+class _Profile:
+    """
+    _Profile() - phase times of one request, a nested phase pauses the one it runs in
+    so every moment is booked to exactly one phase
+    """
+    __slots__ = ('start', 'times', 'db_calls', 'active', 'mark', 'stack')
+
+    def __init__(self):
+        self.start = self.mark = time.perf_counter()
+        self.times = {'db': 0.0, 'transform': 0.0, 'render': 0.0}
+        self.db_calls = 0
+        self.active = None
+        self.stack = []
+
+    def enter(self, phase):
+        now = time.perf_counter()
+        if self.active:
+            self.times[self.active] += now - self.mark
+        self.stack.append(self.active)
+        self.active = phase
+        self.mark = now
+
+    def exit(self):
+        now = time.perf_counter()
+        self.times[self.active] += now - self.mark
+        self.active = self.stack.pop()
+        self.mark = now
+
+    def sample(self):
+        """sample() - (total, db, transform, render, other) in ms and the number of database calls"""
+        total = time.perf_counter() - self.start
+        db, transform, render = self.times['db'], self.times['transform'], self.times['render']
+        return (total * 1000, db * 1000, transform * 1000, render * 1000,
+                max(0.0, total - db - transform - render) * 1000, self.db_calls)
+
+
+class _RouteProfiler:
+    """
+    _RouteProfiler(window) - keeps the samples of the last window requests of every route
+    in fixed size deques, percentiles are computed when the stats page asks for them
+    """
+    def __init__(self, window=1000):
+        self.window = window
+        self.samples = {}
+        self.requests = {}
+
+    def run(self, route, f, env, kwargs):
+        """run(route, f, env, kwargs) - call the handler f with a profile record for this thread"""
+        record = _Profile()
+        _profiling.record = record
+        try:
+            return f(env, **kwargs)
+        finally:
+            _profiling.record = None
+            samples = self.samples.get(route)
+            if samples is None:
+                samples = self.samples.setdefault(route, deque(maxlen=self.window))
+            samples.append(record.sample())
+            self.requests[route] = self.requests.get(route, 0) + 1
+
+    def stats(self):
+        """
+        stats() - {route: {'requests', 'total', 'db', 'transform', 'render', 'other', 'db_calls'}},
+            each phase as {'p50', 'p95', 'p99', 'mean'} over the recent requests (ms, calls)
+        """
+        result = {}
+        for route, samples in list(self.samples.items()):
+            columns = list(zip(*list(samples)))
+            if not columns:
+                continue
+            stats = {'requests': self.requests.get(route, 0)}
+            for name, values in zip(('total',) + _PROFILE_PHASES + ('db_calls',), columns):
+                values = sorted(values)
+                percentile = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+                stats[name] = {'p50': percentile(0.50), 'p95': percentile(0.95), 'p99': percentile(0.99),
+                               'mean': sum(values) / len(values)}
+            result[route] = stats
+        return result
+
+
+class _ProfiledDatabase:
+    """_ProfiledDatabase(database) - database wrapper whose collections book their calls to the 'db' phase"""
+    def __init__(self, database):
+        self.wrapped = database
+
+    def __getattr__(self, name):
+        return _profiled_attribute(getattr(self.wrapped, name))
+
+    def __getitem__(self, coll):
+        return _ProfiledCollection(self.wrapped[coll])
+
+    def get_collection(self, coll, **kwargs):
+        return _ProfiledCollection(self.wrapped.get_collection(coll, **kwargs))
+
+
+class _ProfiledCollection:
+    """_ProfiledCollection(collection) - collection wrapper timing and counting every call"""
+    def __init__(self, collection):
+        self.wrapped = collection
+
+    def __getattr__(self, name):
+        return _profiled_attribute(getattr(self.wrapped, name))
+
+
+class _ProfiledCursor:
+    """_ProfiledCursor(cursor) - cursor wrapper booking the fetching of documents to the 'db' phase"""
+    def __init__(self, cursor):
+        self.wrapped = cursor
+
+    def __getattr__(self, name):
+        value = getattr(self.wrapped, name)
+        if not callable(value):
+            return value
+
+        @wraps(value)
+        def chained(*args, **kwargs):
+            result = value(*args, **kwargs)
+            # sort(), limit(), skip() ... return the cursor itself
+            return self if result is self.wrapped else result
+        return chained
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        record = getattr(_profiling, 'record', None)
+        if record is None:
+            return next(self.wrapped)
+        record.enter('db')
+        try:
+            return next(self.wrapped)
+        finally:
+            record.exit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.wrapped.close()
+
+
+def _profiled_attribute(value):
+    """
+    _profiled_attribute(value) - an attribute of a wrapped database or collection: methods are
+    profiled, collections (db.users, or the sub-collection db.users.archive) are wrapped as db['users']
+    is and anything else is returned as is.  A pymongo Collection is callable, so callable() cannot
+    tell it from a method.
+    """
+    if inspect.ismethod(value):
+        return _profiled_call(value)
+    if isinstance(value, (Collection, MontyCollection)):
+        return _ProfiledCollection(value)
+    return value
+
+def _profiled_call(method):
+    """_profiled_call(method) - wrap a database method, count it and book its time to 'db'"""
+    @wraps(method)
+    def call(*args, **kwargs):
+        record = getattr(_profiling, 'record', None)
+        if record is None:
+            result = method(*args, **kwargs)
+        else:
+            record.db_calls += 1
+            record.enter('db')
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                record.exit()
+        if hasattr(result, '__next__') and not isinstance(result, _ProfiledCursor):
+            return _ProfiledCursor(result)
+        return result
+    return call
+
+
+def _batches(cursor, batch_size):
+    """_batches(cursor, batch_size) - group the documents of a cursor into lists of batch_size"""
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _ndjson_chunks(cursor, batch_size):
+    """_ndjson_chunks(cursor, batch_size) - one JSON document per line, a chunk per batch"""
+    for batch in _batches(cursor, batch_size):
+        yield ''.join(json.dumps(doc, default=str) + '\n' for doc in batch)
+
+def _csv_chunks(cursor, columns, batch_size):
+    """
+    _csv_chunks(cursor, columns, batch_size) - CSV with a header row, a chunk per batch.
+    Without columns (no schema) they are the flattened fields of the first batch.  The fields
+    of a document that no column holds (outside the schema, or first seen in a later batch)
+    are written as a JSON object of dotted names in a last _extra column, which import reads
+    back (see _csv_rows).  Nested values are written as JSON.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if columns is not None:
+        writer.writerow(columns + [_CSV_EXTRA])
+    for batch in _batches(cursor, batch_size):
+        if columns is None:
+            columns = ['_id']
+            for doc in batch:
+                columns.extend(k for k in _flatten_dict(doc) if k not in columns)
+            writer.writerow(columns + [_CSV_EXTRA])
+        for doc in batch:
+            row = [_csv_value(_get_dotted_value(name, doc)) for name in columns]
+            extra = _csv_extra(doc, columns)
+            row.append(json.dumps(extra, default=str) if extra else '')
+            writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # an empty collection still gets its header
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _csv_extra(doc, columns):
+    """
+    _csv_extra(doc, columns) - the flattened fields of doc that no CSV column holds,
+    a column holds its own field and everything nested under it
+    """
+    extra = {}
+    for name, value in _flatten_dict(doc).items():
+        parts = name.split('.')
+        if not any('.'.join(parts[:i]) in columns for i in range(1, len(parts) + 1)):
+            extra[name] = value
+    return extra
+
+def _csv_value(value):
+    """_csv_value(value) - render a document value for a CSV cell"""
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return value
+
+class _RequestBody(io.RawIOBase):
+    """
+    _RequestBody(stream, length) - readable view of a WSGI input stream that stops at
+    CONTENT_LENGTH, so it can be wrapped by io.BufferedReader / io.TextIOWrapper
+    """
+    def __init__(self, stream, length):
+        self.stream = stream
+        self.remaining = length
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.remaining <= 0:
+            return 0
+        data = self.stream.read(min(len(buffer), self.remaining))
+        self.remaining -= len(data)
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _ndjson_rows(fp):
+    """_ndjson_rows(fp) - yield (row, document) for each line, a bad line yields its exception"""
+    row = 0
+    for line in fp:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            yield row, json.loads(line)
+        except ValueError as e:
+            yield row, e
+
+def _csv_rows(fp):
+    """
+    _csv_rows(fp) - yield (row, document) for each CSV row, dotted column names are nested
+    and the JSON object of an _extra column (see _csv_chunks) is merged into the document
+    """
+    for row, values in enumerate(csv.DictReader(fp), 1):
+        # values of surplus columns are collected under None
+        values.pop(None, None)
+        extra = values.pop(_CSV_EXTRA, None)
+        if extra:
+            try:
+                values.update(json.loads(extra))
+            except (TypeError, ValueError) as e:
+                yield row, ValueError("invalid %s column, %s" % (_CSV_EXTRA, e))
+                continue
+        yield row, _unflatten(values)
+
+def _json_array_rows(fp, chunk_size=65536):
+    """
+    _json_array_rows(fp, chunk_size=65536) - yield (row, item) for the items of a JSON array
+    without reading the whole array.  Raises ValueError if the file is not a JSON array.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    started = need_comma = False
+    row = 0
+    while True:
+        buffer = buffer.lstrip()
+        if not buffer:
+            if eof:
+                raise ValueError("unexpected end of the JSON array")
+            chunk = fp.read(chunk_size)
+            buffer, eof = chunk, not chunk
+            continue
+        if not started:
+            if buffer[0] != '[':
+                raise ValueError("expected a JSON array")
+            buffer, started = buffer[1:], True
+        elif buffer[0] == ']':
+            return
+        elif need_comma:
+            if buffer[0] != ',':
+                raise ValueError("expected ',' between the items of the JSON array")
+            buffer, need_comma = buffer[1:], False
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except ValueError:
+                item, end = None, None
+            # an item cut at the end of the buffer (or a failed decode) needs more data
+            if (end is None or end == len(buffer)) and not eof:
+                chunk = fp.read(chunk_size)
+                buffer, eof = buffer + chunk, not chunk
+                continue
+            if end is None:
+                raise ValueError("invalid JSON in item %d" % (row + 1))
+            row += 1
+            buffer, need_comma = buffer[end:], True
+            yield row, item
+
+@_phase('transform')
+def _coerce_document(doc, schema):
+    """
+    _coerce_document(doc, schema) - convert the string values of doc to the types given in the
+    compiled schema (the type part, or a checkbox control).  Raises ValueError on a bad value.
+    """
+    for field in schema['fields']:
+        convert = _COERCIONS.get(field.get('type', field['control']).lower())
+        if convert is None:
+            continue
+        parts = field['name'].split('.')
+        parent = doc
+        for part in parts[:-1]:
+            parent = parent.get(part)
+            if not isinstance(parent, dict):
+                break
+        else:
+            value = parent.get(parts[-1])
+            if isinstance(value, str) and value != '':
+                try:
+                    parent[parts[-1]] = convert(value)
+                except ValueError:
+                    raise ValueError("%s: cannot convert %r to %s" % (field['name'], value, field.get('type', field['control'])))
+
+def _to_bool(value):
+    """_to_bool(value) - interpret a form/CSV string as a boolean"""
+    lowered = value.strip().lower()
+    if lowered in ('1', 'true', 'yes', 'on', 'y', 't'):
+        return True
+    if lowered in ('0', 'false', 'no', 'off', 'n', 'f'):
+        return False
+    raise ValueError(value)
+
+def _to_number_strict(value):
+    """_to_number_strict(value) - like _to_number but raise ValueError if value is not a number"""
+    number = _to_number(value)
+    if number is None:
+        raise ValueError(value)
+    return number
+
+# schema types (and controls) whose values are converted on import
+_COERCIONS = {
+    'int': int, 'integer': int,
+    'float': float, 'number': _to_number_strict,
+    'bool': _to_bool, 'boolean': _to_bool, 'checkbox': _to_bool,
+}
+
+def _insert_batch(collection, batch, report):
+    """
+    _insert_batch(collection, batch, report) - write a list of (row, document) with one unordered
+    insert_many(), rows the database rejects are added to the report
+    """
+    while batch:
+        try:
+            collection.insert_many([doc for row, doc in batch], ordered=False)
+            report['inserted'] += len(batch)
+            return
+        except (BulkWriteError, MontyBulkWriteError) as e:
+            errors = e.details.get('writeErrors', [])
+            report['inserted'] += e.details.get('nInserted', 0)
+            for error in errors:
+                _import_error(report, batch[error['index']][0], error.get('errmsg', 'write error'))
+            if not errors or e.details.get('nInserted', 0) + len(errors) >= len(batch):
+                return
+            # MontyDB stops at its first error, carry on with the rest of the batch
+            batch = batch[max(error['index'] for error in errors) + 1:]
+
+def _import_error(report, row, message, limit=100):
+    """_import_error(report, row, message) - count a failed row, keep the first limit messages"""
+    report['failed'] += 1
+    if len(report['errors']) < limit:
+        report['errors'].append({'row': row, 'message': message})
+
+
+def _merge_dicts(dict1, dict2):
+    """ 
+    _merge_dicts(dict1, dict2) - merge two dictionaries, return the union.
+    Using yield increases efficiency.
+    From
+    """
+    for k in set(dict1.keys()).union(dict2.keys()):
+        if k in dict1 and k in dict2:
+            if isinstance(dict1[k], dict) and isinstance(dict2[k], dict):
+                # unfortunately, a recursive call
+                yield (k, dict(_merge_dicts(dict1[k], dict2[k])))
+            else:
+                # If one of the values is not a dict, you can't continue merging it.
+                # Value from second dict overrides one in first and we move on.
+                yield (k, dict2[k])
+                # Alternatively, replace this with exception raiser to alert you of value conflicts
+        elif k in dict1:
+            yield (k, dict1[k])
+        else:
+            yield (k, dict2[k])
+    
+@_phase('transform')
+def expand_fields(fields):
+    """
+    expand_fields(fields) - expand flattened fields to nested fields
+    : params data - a flattened record
+    returns expanded fields
+    """
+    data = {}
+    for name, value in fields.items():
+        data = dict( _merge_dicts(data, _nest_value(name, value)) )
+    return data
+
+def _nest_value(name, value):
+    """
+    _nest_value(name, value) - put the fields from a 
+    "flattened" dotted name into nested structure and return
+    
+    :param name - the flattened dotted name
+    :param value - the actual value
+    
+    return nested_value
+    
+    How can I do this cleaner with a dict structure?
+    """
+    data = {}
+    parts = name.strip().split('.')
+    if len(parts) == 1:
+        data.update({parts[0]:value})
+    elif len(parts) == 2:
+        data.update({parts[0]: {parts[1]:value}})
+    elif len(parts) == 3:
+        data.update( {parts[0]: { parts[1] : { parts[2] : value } } } )
+    else:
+        raise ValueError("Schmema depth exceeds maximum limit of 3")
+    return data
+    
+
+def _get_dotted_value(name, data):
+    """
+    _get_dotted_value(name, data) - get the raw value at a dotted name, None if it is missing
+    unlike _get_nested_value, the stored value is returned as is (including dicts)
+    """
+    value = data
+    for part in name.strip().split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _get_nested_value(name, data):
     """
     _get_nested_value(name, data) - get the fields from a "flattened" dotted name
     :param name - the flattened dotted name
@@ -709,6 +3084,7 @@ def _get_nested_value(name, data):
     return None
 
 
+@_phase('transform')
 def _schema_transform(data, schema):
     """_schema_transform(data, schema) - create fields from data document and schema. These
     fields are used to create a form for editing the document. The fields are ordered.
@@ -725,6 +3101,7 @@ def _schema_transform(data, schema):
     
     implemented:
     A caret (^) is used to indicate that the field is shown in a list-view.
+    A hash (#) is used to indicate an indexed (sortable) field, see Admin.view_indexes.
     
     not implemented in this version:
     A asterisk (*) is used to indicate a required field.
@@ -738,17 +3115,46 @@ def _schema_transform(data, schema):
     type (simple types only)
     
     """
-    # grab the schema buffer
-    schema_lines = schema.get('schema').split('\n')
+    if 'fields' not in schema:
+        schema = _compile_schema(schema)
     fields = []
-    for line in schema_lines:
-        if line:
+    for spec in schema['fields']:
+        field = {}
+        
+        # if there is an '_id' field, then this is an existing document
+        if '_id' in data:
+            field.update({'_id': data['_id']})
+        field.update(spec)
+        default = field.pop('default')
+        
+        # value for field(data) is none, get it from schema
+        if data == {}:
+            field['value'] = default
+        else:
+            # transform multiple depths
+            value = _get_nested_value(field['name'], data)
+            field['value'] = value
+            
+        fields.append(field)
+    return fields
+
+
+def _compile_schema(schema):
+    """_compile_schema(schema) - parse a _meta schema record once into a reusable form
+    (see _schema_transform for the schema format)
+    
+    :param schema - the schema record from _meta
+    
+    return
+        compiled schema, a copy of the record with
+        'fields' - ordered field specs (list-view, required, indexed, name, control, label, type, default)
+        'projection' - projection of the list-view fields, None if there are none
+    """
+    fields = []
+    for line in schema.get('schema').split('\n'):
+        if line.strip():
             field = {}
             
-            # if there is an '_id' field, then this is an existing document
-            if '_id' in data:
-                field.update({'_id': data['_id']})
-                
             # break it on ':'
             parts = line.split(':')
             
@@ -762,6 +3168,10 @@ def _schema_transform(data, schema):
             field['required'] = '*' in parts[0]
             parts[0] = parts[0].replace('*', '')
             
+            # is it an indexed field?
+            field['indexed'] = '#' in parts[0]
+            parts[0] = parts[0].replace('#', '')
+            
             field['name'] = parts[0].strip() # the name part
             
             field['control'] = parts[1].strip() # get the type
@@ -774,20 +3184,26 @@ def _schema_transform(data, schema):
             if len(parts) > 3:
                 field['type'] = parts[3].strip()
             
-            # value for field(data) is none, get it from schema
-            if data == {}:
-                if len(parts) > 4:
-                    field['value'] = parts[4].strip()
-                else:
-                    # if value is missing, make it an empty string
-                    field['value'] = ''
-            else:
-                # transform multiple depths
-                value = _get_nested_value(field['name'], data)
-                field['value'] = value
-                
+            # if value is missing, make it an empty string
+            field['default'] = parts[4].strip() if len(parts) > 4 else ''
+            
             fields.append(field)
-    return fields
+    
+    compiled = dict(schema)
+    compiled['fields'] = fields
+    # the _id is always included in a projection
+    compiled['projection'] = {f['name']: 1 for f in fields if f['list-view']} or None
+    return compiled
+
+
+def _invalidate_schema(key):
+    """
+    _invalidate_schema(key) - drop a compiled schema from the cache after _meta changed, see Admin._schema_key(),
+    the key of the _meta collection itself (Admin._cache_key('_meta')) drops all of its schemas
+    """
+    _schema_cache.pop(key, None)
+    for cached in [cached for cached in _schema_cache if cached[:len(key)] == key]:
+        _schema_cache.pop(cached, None)
 
 
 def _unflatten(dictionary, separator='.'):
@@ -825,6 +3241,7 @@ def _flatten_dict(d, parent_key = '', sep='.'):
             items.append((new_key, v))
     return dict(items)
 
+@_phase('transform')
 def _fields_transform(fields):
     """transform fields to be used in form"""
     # flatten dictionary if needed
@@ -860,12 +3277,32 @@ def login_required(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        _admin_session.connect()
-        if 'user' not in _admin_session.data:
+        env = args[0] if args and isinstance(args[0], dict) else None
+        if not _session_user(_admin_session, env):
             return redirect(_app.url_for('admin_login'))
         return f(*args, **kwargs)
     return decorated_function
 
+def _session_user(session, env=None):
+    """
+    _session_user(session, env=None) - return the authenticated user of the session or None
+        the session store is read once per request, the result is memoized on the env
+    """
+    if env is not None and _SESSION_USER in env:
+        return env[_SESSION_USER]
+    session.connect()
+    _count_session_load(env)
+    user = session.data.get('user') if session.data.get('is_authenticated') else None
+    if env is not None:
+        env[_SESSION_USER] = user
+    return user
+
+def _count_session_load(env):
+    """_count_session_load(env) - count one session store load against the route of env"""
+    route = env.get(_ROUTE) if env is not None else None
+    counts = _session_loads.setdefault(route or '-', {'requests': 0, 'loads': 0})
+    counts['loads'] += 1
+
 if __name__ == '__main__':
     print(f"Minimus Admin - VERSION {version}")
     print("... Minimus Admin is not intended for direct execution. ...")
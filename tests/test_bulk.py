@@ -0,0 +1,81 @@
+"""bulk delete, set and unset on the selected, filtered or all documents of a collection"""
+import io
+import json
+from urllib.parse import urlencode
+
+import pytest
+
+pytest.importorskip('minimus')
+
+from minimus import Minimus
+import minimus_admin
+
+
+@pytest.fixture
+def admin(tmp_path):
+    app = Minimus(__name__)
+    # a small page size makes a MontyDB search write in several batches
+    admin = minimus_admin.Admin(app, db_file=str(tmp_path / 'bulk.db'), require_authentication=False, page_size=3)
+    app.db['_meta'].insert_one({'name': 'items', 'schema': 'n:int\ngroup:str\ntext:str'})
+    app.db['items'].insert_many([{'n': i, 'group': 'even' if i % 2 == 0 else 'odd',
+                                  'text': 'alpha beta' if i < 8 else 'gamma'} for i in range(10)])
+    return admin
+
+
+def _bulk(admin, **form):
+    body = urlencode(form).encode('utf-8')
+    env = {'REQUEST_METHOD': 'POST', 'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+           'CONTENT_LENGTH': str(len(body)), 'wsgi.input': io.BytesIO(body)}
+    return admin.bulk_collection(env, 'items')
+
+
+def _error(result):
+    return isinstance(result, str) and result.startswith('{') and json.loads(result).get('status') == 'error'
+
+
+def _numbers(admin, query=None):
+    return sorted(doc['n'] for doc in admin.app.db['items'].find(query or {}))
+
+
+def test_empty_filter_is_refused(admin):
+    assert _error(_bulk(admin, action='delete', scope='filter', query=''))
+    assert _error(_bulk(admin, action='delete', scope='filter', query='q.group='))
+    assert len(_numbers(admin)) == 10
+
+
+def test_all(admin):
+    _bulk(admin, action='set', scope='all', field='flag', value='x')
+    assert admin.app.db['items'].count_documents({'flag': 'x'}) == 10
+    _bulk(admin, action='delete', scope='all')
+    assert _numbers(admin) == []
+
+
+def test_selected_object_ids(admin):
+    ids = [str(doc['_id']) for doc in admin.app.db['items'].find({'n': {'$in': [1, 2, 3]}})]
+    _bulk(admin, action='delete', scope='selected', ids=','.join(ids))
+    assert _numbers(admin) == [0, 4, 5, 6, 7, 8, 9]
+    assert _error(_bulk(admin, action='delete', scope='selected', ids=' , '))
+
+
+def test_filter(admin):
+    _bulk(admin, action='set', scope='filter', query='q.group=odd', field='n', value='100')
+    # the value is converted to the schema type
+    assert admin.app.db['items'].count_documents({'n': 100}) == 5
+
+
+def test_search_batches(admin):
+    params = {'search': 'alpha', 'q.group': 'even'}
+    assert len(admin._text_batches('items', params)) == 2
+    _bulk(admin, action='delete', scope='filter', query=urlencode(params))
+    assert _numbers(admin) == [1, 3, 5, 7, 8, 9]
+    # a search without matches writes nothing
+    _bulk(admin, action='delete', scope='filter', query='search=nothing')
+    assert len(_numbers(admin)) == 6
+
+
+def test_unset(admin):
+    _bulk(admin, action='unset', scope='filter', query='search=gamma', field='text')
+    assert _numbers(admin, {'text': {'$exists': False}}) == [8, 9]
+    assert _error(_bulk(admin, action='unset', scope='all', field='_id'))
+    assert _error(_bulk(admin, action='rename', scope='all', field='text'))
+    assert len(_numbers(admin, {'text': {'$exists': True}})) == 8
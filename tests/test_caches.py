@@ -0,0 +1,74 @@
+"""process-wide caches are not shared between Admins on different databases"""
+import io
+import json
+from urllib.parse import urlencode
+
+import pytest
+
+pytest.importorskip('minimus')
+
+from minimus import Minimus
+import minimus_admin
+
+
+def _admin(path, schema, count):
+    app = Minimus(__name__)
+    admin = minimus_admin.Admin(app, db_file=str(path), require_authentication=False)
+    app.db['_meta'].insert_one({'name': 'items', 'schema': schema})
+    app.db['items'].insert_many([{'title': 'hello %d' % i} for i in range(count)])
+    return admin
+
+
+def _post(**form):
+    body = urlencode(form).encode('utf-8')
+    return {'REQUEST_METHOD': 'POST', 'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(body)), 'wsgi.input': io.BytesIO(body)}
+
+
+def test_same_database_name_on_different_files(tmp_path):
+    first = _admin(tmp_path / 'first.db', 'title:str', 2)
+    second = _admin(tmp_path / 'second.db', 'name:str', 5)
+    assert [f['name'] for f in first.get_schema('items')['fields']] == ['title']
+    assert [f['name'] for f in second.get_schema('items')['fields']] == ['name']
+    assert first.collection_stats('items')['count'] == 2
+    assert second.collection_stats('items')['count'] == 5
+    assert len(first.text_query('items', 'hello')['_id']['$in']) == 2
+    assert len(second.text_query('items', 'hello')['_id']['$in']) == 5
+
+
+def test_routed_collections(tmp_path):
+    app = Minimus(__name__)
+    admin = minimus_admin.Admin(app, db_file=str(tmp_path / 'main.db'), require_authentication=False,
+                                collection_routes=[('logs*', str(tmp_path / 'logs.db'))])
+    app.db.logs.insert_one({'line': 1})
+    app.db.items.insert_one({'title': 'x'})
+    assert app.db.logs.database is app.db.database_for('logs')
+    assert app.db.items.find_one({})['title'] == 'x'
+    assert app.db.client is app.db.default.client
+    assert admin._cache_key('logs')[0] != admin._cache_key('items')[0]
+
+
+def test_renamed_schema(tmp_path):
+    admin = _admin(tmp_path / 'rename.db', 'title:str', 1)
+    assert admin.get_schema('items') is not None
+    admin.add_mod_collection(_post(name='things', schema='title:str'), coll='items')
+    assert admin.get_schema('items') is None
+    assert admin.get_schema('things') is not None
+
+
+def test_meta_edited_as_collection(tmp_path):
+    admin = _admin(tmp_path / 'meta.db', 'title:str', 1)
+    assert [f['name'] for f in admin.get_schema('items')['fields']] == ['title']
+    rec = admin.app.db['_meta'].find_one({'name': 'items'})
+    content = json.dumps({'name': 'items', 'schema': 'title:str\ncount:int'})
+    admin.edit_json(_post(content=content), '_meta', str(rec['_id']))
+    assert [f['name'] for f in admin.get_schema('items')['fields']] == ['title', 'count']
+
+
+def test_schema_ttl(tmp_path):
+    admin = _admin(tmp_path / 'ttl.db', 'title:str', 1)
+    admin.schema_ttl = 0
+    assert admin.get_schema('items') is not None
+    # as another process would, change _meta behind the admin's back
+    admin.app.db['_meta'].delete_many({})
+    assert admin.get_schema('items') is None
@@ -0,0 +1,31 @@
+"""query parameters echoed back into collection views are escaped"""
+import pytest
+
+pytest.importorskip('minimus')
+
+from minimus import Minimus
+import minimus_admin
+
+ATTACK = '%22%3E%3Cscript%3Ealert(1)%3C/script%3E'
+
+
+@pytest.fixture
+def admin(tmp_path):
+    app = Minimus(__name__)
+    admin = minimus_admin.Admin(app, db_file=str(tmp_path / 'escaping.db'), require_authentication=False)
+    app.db['items'].insert_many([{'n': i} for i in range(3)])
+    return admin
+
+
+@pytest.mark.parametrize('name', ['search', 'q.n', 'sort', 'size'])
+def test_streamed_view(admin, name):
+    env = {'REQUEST_METHOD': 'GET', 'QUERY_STRING': '%s=%s' % (name, ATTACK), minimus_admin._STREAMING: True}
+    admin.view_collection(env, 'items')
+    html = b''.join(env[minimus_admin._STREAM_RESPONSE]).decode('utf-8')
+    assert '<script>alert' not in html
+
+
+@pytest.mark.parametrize('name', ['search', 'q.n', 'sort'])
+def test_rendered_view(admin, name):
+    html = admin.view_collection({'REQUEST_METHOD': 'GET', 'QUERY_STRING': '%s=%s' % (name, ATTACK)}, 'items')
+    assert '<script>alert' not in html
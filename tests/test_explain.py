@@ -0,0 +1,29 @@
+"""index suggestions of the query explain report"""
+import pytest
+
+pytest.importorskip('minimus')
+
+from minimus import Minimus
+import minimus_admin
+
+
+@pytest.fixture
+def collection(tmp_path):
+    app = Minimus(__name__)
+    minimus_admin.Admin(app, db_file=str(tmp_path / 'explain.db'), require_authentication=False)
+    app.db['items'].insert_many([{'n': i, 'group': 'even' if i % 2 == 0 else 'odd'} for i in range(5)])
+    return app.db['items']
+
+
+def test_top_level_fields(collection):
+    report = minimus_admin._explain_report(collection, {'group': 'odd'}, None, [('n', 1)], 10)
+    assert report['returned'] == 2
+    assert report['suggest'] == ['group', 'n']
+
+
+def test_fields_inside_and(collection):
+    # the shape of a filtered keyset page
+    query = {'$and': [{'group': 'even'},
+                      {'$or': [{'n': {'$gt': 0}}, {'n': 0, '_id': {'$gt': 0}}]}]}
+    report = minimus_admin._explain_report(collection, query, None, [('n', 1), ('_id', 1)], 10)
+    assert report['suggest'] == ['group', 'n']
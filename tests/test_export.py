@@ -0,0 +1,59 @@
+"""export_collection writes every field and its files import back (see import_documents)"""
+import io
+
+import pytest
+
+pytest.importorskip('minimus')
+
+from minimus import Minimus
+import minimus_admin
+
+SCHEMA = '^name : textbox : Name\nn : textbox : Number : int\naddress.city : textbox : City'
+
+
+@pytest.fixture
+def admin(tmp_path):
+    app = Minimus(__name__)
+    admin = minimus_admin.Admin(app, db_file=str(tmp_path / 'export.db'), require_authentication=False)
+    admin.export_batch_size = 2
+    return admin
+
+
+def _export(admin, coll, fmt):
+    env = {'REQUEST_METHOD': 'GET', 'QUERY_STRING': 'format=' + fmt, minimus_admin._STREAMING: True}
+    admin.export_collection(env, coll)
+    return b''.join(env[minimus_admin._STREAM_RESPONSE]).decode('utf-8')
+
+
+def _documents(admin, coll):
+    return sorted(admin.app.db[coll].find({}, {'_id': 0}), key=lambda doc: doc['name'])
+
+
+def _round_trip(admin, fmt):
+    text = _export(admin, 'items', fmt)
+    report = admin.import_documents('copy', io.StringIO(text, newline=''), fmt)
+    assert report['failed'] == 0, report['errors']
+    return _documents(admin, 'copy')
+
+
+def test_csv_keeps_fields_outside_the_schema(admin):
+    admin.app.db['_meta'].insert_one({'name': 'items', 'schema': SCHEMA})
+    admin.app.db['_meta'].insert_one({'name': 'copy', 'schema': SCHEMA})
+    admin.app.db['items'].insert_many([
+        {'name': 'a', 'n': 1, 'address': {'city': 'x'}},
+        {'name': 'b', 'n': 2, 'address': {'city': 'y', 'zip': '123'}, 'extra': [1, 2]},
+        {'name': 'c', 'n': 3, 'address': {'city': 'z'}, 'late': {'deep': True}},
+    ])
+    text = _export(admin, 'items', 'csv')
+    assert text.splitlines()[0] == '_id,name,n,address.city,_extra'
+    assert _round_trip(admin, 'csv') == _documents(admin, 'items')
+
+
+def test_csv_keeps_fields_first_seen_in_a_later_batch(admin):
+    admin.app.db['items'].insert_many([{'name': 'a'}, {'name': 'b'}, {'name': 'c', 'late': 'yes'}])
+    assert _round_trip(admin, 'csv') == _documents(admin, 'items')
+
+
+def test_ndjson_round_trip(admin):
+    admin.app.db['items'].insert_many([{'name': 'a', 'n': 1}, {'name': 'b', 'tags': ['x']}, {'name': 'c'}])
+    assert _round_trip(admin, 'ndjson') == _documents(admin, 'items')
@@ -0,0 +1,63 @@
+"""bulk document imports: parsing, schema coercion and rows rejected by the database"""
+import io
+
+import pytest
+
+pytest.importorskip('minimus')
+
+from minimus import Minimus
+import minimus_admin
+
+
+@pytest.fixture
+def admin(tmp_path):
+    app = Minimus(__name__)
+    admin = minimus_admin.Admin(app, db_file=str(tmp_path / 'import.db'), require_authentication=False)
+    app.db['_meta'].insert_one({'name': 'items', 'schema': 'n:int\ntitle:str'})
+    return admin
+
+
+def _import(admin, text, fmt, **kwargs):
+    return admin.import_documents('items', io.StringIO(text, newline=''), fmt, **kwargs)
+
+
+def _rows(report):
+    return [error['row'] for error in report['errors']]
+
+
+def test_ndjson(admin):
+    text = '{"n": "1", "title": "a"}\n\n{"n": 2\n[1, 2]\n{"n": "x"}\n{"n": 5, "title": "b"}\n'
+    batches = []
+    report = _import(admin, text, 'ndjson', batch_size=1, progress=lambda report: batches.append(report['inserted']))
+    assert (report['rows'], report['inserted'], report['failed']) == (5, 2, 3)
+    assert _rows(report) == [2, 3, 4]
+    assert batches == [1, 2]
+    assert sorted(doc['n'] for doc in admin.app.db['items'].find()) == [1, 5]
+
+
+def test_csv_coercion(admin):
+    report = _import(admin, 'n,title,extra.x\n3,c,y\n4,d,\n', 'csv')
+    assert report['inserted'] == 2
+    doc = admin.app.db['items'].find_one({'n': 3})
+    assert doc['title'] == 'c' and doc['extra'] == {'x': 'y'}
+
+
+def test_json_array(admin):
+    report = _import(admin, '[{"n": 1}, {"n": 2}, {"n": 3}', 'json')
+    assert report['inserted'] == 3
+    assert report['failed'] == 1
+
+
+@pytest.mark.parametrize('batch_size', [1, 2, 100])
+def test_duplicate_ids(admin, batch_size):
+    admin.app.db['items'].insert_one({'_id': 2, 'n': 0})
+    text = ''.join('{"_id": %d, "n": %d}\n' % (id, id) for id in [1, 2, 3, 1, 4])
+    report = _import(admin, text, 'ndjson', batch_size=batch_size)
+    assert (report['inserted'], report['failed']) == (3, 2)
+    assert sorted(_rows(report)) == [2, 4]
+    assert sorted(doc['_id'] for doc in admin.app.db['items'].find()) == [1, 2, 3, 4]
+
+
+def test_unknown_format(admin):
+    with pytest.raises(ValueError):
+        _import(admin, '', 'xml')
@@ -0,0 +1,78 @@
+"""keyset paging of view_collection on the default (MontyDB) backend"""
+import re
+
+import pytest
+
+pytest.importorskip('minimus')
+
+from minimus import Minimus
+import minimus_admin
+
+
+@pytest.fixture
+def admin(tmp_path):
+    app = Minimus(__name__)
+    admin = minimus_admin.Admin(app, db_file=str(tmp_path / 'paging.db'), require_authentication=False)
+    app.db['items'].insert_many([{'n': i, 'group': 'odd' if i % 2 else 'even', 'text': 'fizz' if i % 3 else 'buzz'}
+                                 for i in range(23)])
+    return admin
+
+
+def _page(admin, query_string):
+    html = admin.view_collection({'REQUEST_METHOD': 'GET', 'QUERY_STRING': query_string}, 'items')
+    assert '"status": "error"' not in html, html
+    numbers = [int(n) for n in re.findall(r'<b>n</b>: (\d+)', html)]
+    links = {}
+    for href, kind in re.findall(r'href="[^"]*\?([^"]*)" class="pagination-(next|previous)"', html):
+        links[kind] = href.replace('&amp;', '&')
+    return numbers, links
+
+
+def _walk(admin, query_string):
+    """follow Next to the last page, then Previous back to the first, return both lists of pages"""
+    forward, backward = [], []
+    numbers, links = _page(admin, query_string)
+    forward.append(numbers)
+    while 'next' in links:
+        numbers, links = _page(admin, links['next'])
+        forward.append(numbers)
+    while 'previous' in links:
+        numbers, links = _page(admin, links['previous'])
+        backward.append(numbers)
+    return forward, backward
+
+
+def test_pages_forward_and_back(admin):
+    forward, backward = _walk(admin, 'size=5')
+    assert forward == [list(range(i, min(i + 5, 23))) for i in range(0, 23, 5)]
+    assert backward == forward[-2::-1]
+
+
+def test_pages_sorted_and_filtered(admin):
+    forward, backward = _walk(admin, 'size=4&sort=n&dir=desc&q.group=odd')
+    expected = list(range(21, 0, -2))
+    assert forward == [expected[i:i + 4] for i in range(0, len(expected), 4)]
+    assert backward == forward[-2::-1]
+
+
+def test_pages_of_a_search(admin):
+    forward, backward = _walk(admin, 'size=3&search=fizz')
+    expected = [i for i in range(23) if i % 3]
+    assert forward == [expected[i:i + 3] for i in range(0, len(expected), 3)]
+    assert backward == forward[-2::-1]
+
+
+def test_pages_of_a_sorted_and_filtered_search(admin):
+    forward, backward = _walk(admin, 'size=2&sort=n&dir=desc&q.group=even&search=fizz')
+    expected = [i for i in range(22, -1, -1) if i % 3 and not i % 2]
+    assert forward == [expected[i:i + 2] for i in range(0, len(expected), 2)]
+    assert backward == forward[-2::-1]
+
+
+@pytest.mark.parametrize('make_id', [int, str, lambda n: {'n': n}], ids=['int', 'str', 'dict'])
+def test_pages_of_ids_that_are_not_object_ids(admin, make_id):
+    admin.app.db['items'].drop()
+    admin.app.db['items'].insert_many([{'_id': make_id(i), 'n': i} for i in range(7)])
+    forward, backward = _walk(admin, 'size=3&sort=n')
+    assert forward == [[0, 1, 2], [3, 4, 5], [6]]
+    assert backward == forward[-2::-1]
@@ -0,0 +1,96 @@
+"""user records: the unique username index, logins throttling and bulk user imports"""
+import io
+
+import pytest
+
+pytest.importorskip('minimus')
+
+from minimus import Minimus
+import minimus_admin
+
+
+@pytest.fixture
+def mongomock_admin():
+    mongomock = pytest.importorskip('mongomock')
+    uri = 'mongodb://mongomock/users'
+    minimus_admin._clients[(uri, '[]')] = mongomock.MongoClient()
+    yield minimus_admin.Admin(Minimus(__name__), db_uri=uri, require_authentication=False)
+    minimus_admin._clients.pop((uri, '[]'), None)
+
+
+def _username_unique(admin):
+    info = admin.app.db[admin.users_collection].index_information()
+    return any(spec['key'] == [('username', 1)] and spec.get('unique') for spec in info.values())
+
+
+def test_user_index_is_made_by_the_first_lookup(mongomock_admin):
+    assert not _username_unique(mongomock_admin)
+    assert mongomock_admin.get_user('nobody') is None
+    assert _username_unique(mongomock_admin)
+
+
+def test_user_index_is_made_by_import_users(mongomock_admin):
+    mongomock_admin.import_users(io.StringIO('{"username": "a", "password": "x"}\n'), 'ndjson', processes=1)
+    assert _username_unique(mongomock_admin)
+
+
+def test_update_user_result(mongomock_admin):
+    mongomock_admin.create_user('joe', 'secret')
+    result = mongomock_admin.update_user('joe', realname='Joe')
+    assert result and result == {'matched': 1, 'modified': 1}
+    assert mongomock_admin.update_user('joe', realname='Joe') == {'matched': 1, 'modified': 0}
+    assert mongomock_admin.update_user('joe', realname='Joe')
+    missing = mongomock_admin.update_user('nobody', realname='Nobody')
+    assert not missing and missing == {'matched': 0, 'modified': 0}
+    assert not mongomock_admin.update_user('nobody')
+
+
+def test_token_buckets():
+    buckets = minimus_admin._TokenBuckets(2, 10)
+    assert buckets.take('a', now=0) and buckets.take('a', now=0)
+    assert not buckets.take('a', now=0)
+    # keys have their own buckets
+    assert buckets.take('b', now=0)
+    # one token comes back every 5 seconds
+    assert not buckets.take('a', now=4)
+    assert buckets.take('a', now=5)
+    assert not buckets.take('a', now=5)
+    # buckets that refilled completely are swept
+    assert buckets.take('c', now=100)
+    assert list(buckets.buckets) == ['c']
+
+
+def test_token_buckets_max_keys():
+    buckets = minimus_admin._TokenBuckets(1, 60, max_keys=10)
+    for key in range(25):
+        assert buckets.take(key, now=0)
+    assert len(buckets.buckets) <= 10
+    assert not buckets.take(24, now=0)
+
+
+def test_login_allowed(mongomock_admin):
+    mongomock_admin._login_ip_buckets = minimus_admin._TokenBuckets(2, 60)
+    mongomock_admin._login_user_buckets = minimus_admin._TokenBuckets(2, 60)
+    assert mongomock_admin.login_allowed('10.0.0.1', 'joe')
+    assert mongomock_admin.login_allowed('10.0.0.2', 'joe')
+    assert not mongomock_admin.login_allowed('10.0.0.3', 'joe')
+    assert mongomock_admin.login_allowed('10.0.0.1', 'ann')
+    # a third attempt from the address
+    assert not mongomock_admin.login_allowed('10.0.0.1', 'bob')
+
+
+def test_import_users(mongomock_admin):
+    mongomock_admin.create_user('joe', 'secret')
+    text = ('{"username": "joe", "password": "x"}\n'
+            '{"username": "ann", "password": "pw", "realname": "Ann"}\n'
+            '{"username": "ann", "password": "again"}\n'
+            '{"username": "bob"}\n'
+            'not json\n'
+            '{"username": "cid", "password": "pw"}\n')
+    report = mongomock_admin.import_users(io.StringIO(text), 'ndjson', batch_size=2, processes=1)
+    assert (report['rows'], report['inserted'], report['existing'], report['failed']) == (6, 2, 1, 3)
+    assert [error['row'] for error in report['errors']] == [3, 4, 5]
+    ann = mongomock_admin.get_user('ann')
+    assert ann['realname'] == 'Ann' and ann['password'] != 'pw'
+    assert mongomock_admin.verify_user('ann', 'pw')[0]
+    assert mongomock_admin.verify_user('cid', 'pw')[0]